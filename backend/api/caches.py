@@ -0,0 +1,175 @@
+import gzip
+import time
+from hashlib import sha1
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+CATALOGUE_VERSION_KEY = 'catalogue:{name}:version'
+CATALOGUE_PAYLOAD_KEY = 'catalogue:{name}:{version}'
+RECIPE_BODY_KEY = (
+    'recipe:{id}:body:{updated}:{author_version}:'
+    '{tags_version}:{ingredients_version}')
+AUTHOR_VERSION_NAME = 'author:{id}'
+USER_RELATION_VERSION_NAME = 'user:{user_id}:{relation}'
+USER_RELATION_KEY = 'user:{user_id}:{relation}:{version}'
+SHOPPING_CART_PDF_KEY = 'user:{user_id}:shopping_cart_pdf:{version}'
+
+# Per-user relation id sets as relation: (model, related id field).
+USER_RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'recipe_id'),
+    'following': (Subscription, 'author_id'),
+}
+
+
+class CataloguePayload(NamedTuple):
+    """Rendered catalogue JSON with its gzip variant and ETags."""
+    etag: str
+    body: bytes
+    gzipped_etag: str
+    gzipped_body: bytes
+
+
+def get_catalogue_versions(names):
+    """Return {name: current version} of catalogues (ingredients, tags)."""
+    keys = {name: CATALOGUE_VERSION_KEY.format(name=name) for name in names}
+    versions = cache.get_many(keys.values())
+    for key in keys.values():
+        if key not in versions:
+            cache.add(key, time.time_ns(), timeout=None)
+            versions[key] = cache.get(key)
+    return {name: versions[key] for name, key in keys.items()}
+
+
+def get_catalogue_version(name):
+    """Return the current version of a catalogue (ingredients, tags)."""
+    return get_catalogue_versions([name])[name]
+
+
+def bump_catalogue_version(name):
+    """Invalidate every cached rendering of a catalogue."""
+    key = CATALOGUE_VERSION_KEY.format(name=name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), timeout=None)
+
+
+def get_catalogue(name, render):
+    """Return the cached payload of a catalogue.
+
+    ``render`` is called to produce the JSON bytes only when the
+    current version has not been rendered yet.
+    """
+    key = CATALOGUE_PAYLOAD_KEY.format(
+        name=name, version=get_catalogue_version(name))
+    payload = cache.get(key)
+    if payload is None:
+        body = render()
+        digest = sha1(body).hexdigest()
+        payload = CataloguePayload(
+            etag=f'"{digest}"',
+            body=body,
+            gzipped_etag=f'"{digest}-gzip"',
+            gzipped_body=gzip.compress(body, mtime=0),
+        )
+        cache.set(key, payload, timeout=None)
+    return payload
+
+
+def get_recipe_body_keys(recipes):
+    """Map recipe ids to body cache keys for their current versions.
+
+    A key holds the recipe's ``updated`` time, the version of its author
+    and the tag and ingredient catalogue versions, so any change makes
+    the bodies rendered before it unreachable. Keys are taken before the
+    relations are loaded: a body rendered from rows read before a write
+    is stored under a key no reader computes after the write commits.
+    """
+    author_names = {
+        recipe.author_id: AUTHOR_VERSION_NAME.format(id=recipe.author_id)
+        for recipe in recipes}
+    versions = get_catalogue_versions(
+        ['tags', 'ingredients', *author_names.values()])
+    return {
+        recipe.id: RECIPE_BODY_KEY.format(
+            id=recipe.id,
+            updated=recipe.updated.timestamp(),
+            author_version=versions[author_names[recipe.author_id]],
+            tags_version=versions['tags'],
+            ingredients_version=versions['ingredients'])
+        for recipe in recipes}
+
+
+def get_recipe_bodies(keys):
+    """Return cached viewer-independent recipe bodies by recipe id.
+
+    ``keys`` maps recipe ids to keys from get_recipe_body_keys.
+    """
+    cached = cache.get_many(keys.values())
+    return {
+        recipe_id: cached[key]
+        for recipe_id, key in keys.items() if key in cached}
+
+
+def set_recipe_bodies(keys, bodies):
+    cache.set_many(
+        {keys[recipe_id]: body for recipe_id, body in bodies.items()},
+        timeout=settings.RECIPE_CACHE_TIMEOUT)
+
+
+def bump_author_version(author_id):
+    """Invalidate every cached recipe body showing an author."""
+    bump_catalogue_version(AUTHOR_VERSION_NAME.format(id=author_id))
+
+
+def get_user_relation_ids(user_id, relation):
+    """Return the cached set of ids a user is related to.
+
+    ``relation`` is a key of USER_RELATIONS: favorited recipes, recipes
+    in the shopping cart or followed authors. The version is read before
+    the rows, so a set read before a write commits is stored under a
+    version the write's bump has already left behind.
+    """
+    version = get_catalogue_version(USER_RELATION_VERSION_NAME.format(
+        user_id=user_id, relation=relation))
+    key = USER_RELATION_KEY.format(
+        user_id=user_id, relation=relation, version=version)
+    ids = cache.get(key)
+    if ids is None:
+        model, field = USER_RELATIONS[relation]
+        ids = frozenset(
+            model.objects.filter(user_id=user_id)
+            .values_list(field, flat=True))
+        cache.set(key, ids, timeout=settings.USER_RELATIONS_CACHE_TIMEOUT)
+    return ids
+
+
+def invalidate_user_relation_ids(user_id, relation):
+    bump_catalogue_version(USER_RELATION_VERSION_NAME.format(
+        user_id=user_id, relation=relation))
+
+
+def get_shopping_cart_pdf_key(user_id):
+    return SHOPPING_CART_PDF_KEY.format(
+        user_id=user_id, version=get_catalogue_version('ingredients'))
+
+
+def get_shopping_cart_pdf(user_id):
+    return cache.get(get_shopping_cart_pdf_key(user_id))
+
+
+def set_shopping_cart_pdf(user_id, content):
+    cache.set(
+        get_shopping_cart_pdf_key(user_id), content,
+        timeout=settings.SHOPPING_CART_PDF_CACHE_TIMEOUT)
+
+
+def invalidate_shopping_cart_pdfs(user_ids):
+    cache.delete_many(
+        [get_shopping_cart_pdf_key(user_id) for user_id in user_ids])
@@ -0,0 +1,162 @@
+from operator import attrgetter
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import prefetch_related_objects
+from rest_framework import serializers
+
+from api.caches import (
+    get_recipe_bodies,
+    get_recipe_body_keys,
+    set_recipe_bodies,
+)
+from api.images import get_variant_urls
+from api.serializers import (
+    AmountIngredientSerializer,
+    RecipeReadSerializer,
+    TagSerializer,
+    UserSerializer,
+    get_user_flag,
+)
+from api.services import get_followed_author_ids
+from recipes.models import Recipe
+
+# Fields whose representation of a model value is the value itself.
+PLAIN_FIELDS = (
+    serializers.CharField,
+    serializers.IntegerField,
+    serializers.ReadOnlyField,
+)
+
+
+def compile_plan(serializer_class, special=()):
+    """Compile serializer fields into a flat (name, getter) plan.
+
+    Plain fields get an attribute getter for their source. Fields
+    listed in ``special`` get ``None`` and are rendered by the caller.
+    """
+    plan = []
+    for name, field in serializer_class().fields.items():
+        if field.write_only:
+            continue
+        if name in special:
+            plan.append((name, None))
+        elif isinstance(field, PLAIN_FIELDS):
+            plan.append((name, attrgetter(field.source)))
+        else:
+            raise ImproperlyConfigured(
+                f'{serializer_class.__name__}.{name} has no fast read plan')
+    return tuple(plan)
+
+
+TAG_PLAN = compile_plan(TagSerializer)
+USER_PLAN = compile_plan(UserSerializer, special=('is_subscribed',))
+AMOUNT_INGREDIENT_PLAN = compile_plan(AmountIngredientSerializer)
+RECIPE_PLAN = compile_plan(RecipeReadSerializer, special=(
+    'image', 'image_variants', 'tags', 'author', 'ingredients',
+    'is_favorited', 'is_in_shopping_cart'))
+
+
+def render_plain(obj, plan):
+    return {name: getter(obj) for name, getter in plan}
+
+
+def bind_plan(plan, handlers):
+    return tuple(
+        (name, getter or handlers[name]) for name, getter in plan)
+
+
+def render_user_placeholder(obj):
+    return None
+
+
+def render_image_path(recipe):
+    return recipe.image.url if recipe.image else None
+
+
+def render_tags(recipe):
+    return [render_plain(tag, TAG_PLAN) for tag in recipe.tags.all()]
+
+
+def render_ingredients(recipe):
+    return [
+        render_plain(amount_ingredient, AMOUNT_INGREDIENT_PLAN)
+        for amount_ingredient in recipe.recipe_ingredient.all()]
+
+
+AUTHOR_BODY_PLAN = bind_plan(
+    USER_PLAN, {'is_subscribed': render_user_placeholder})
+RECIPE_BODY_PLAN = bind_plan(RECIPE_PLAN, {
+    'image': render_image_path,
+    'image_variants': lambda recipe: get_variant_urls(recipe.image_variants),
+    'tags': render_tags,
+    'author': lambda recipe: render_plain(recipe.author, AUTHOR_BODY_PLAN),
+    'ingredients': render_ingredients,
+    'is_favorited': render_user_placeholder,
+    'is_in_shopping_cart': render_user_placeholder,
+})
+
+
+def render_recipe_body(recipe):
+    """Render the viewer-independent part of a recipe.
+
+    Per-user flags are left as None and image URLs relative,
+    so the result can be shared between viewers and hosts.
+    """
+    return render_plain(recipe, RECIPE_BODY_PLAN)
+
+
+class RecipeReadPlan:
+    """Fast equivalent of RecipeReadSerializer(many=True).data.
+
+    Expects recipes loaded with ``with_read_relations`` and produces
+    plain dicts that render to the same JSON as the serializer.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.followed_ids = get_followed_author_ids(request)
+
+    def render(self, recipes):
+        return [
+            self.overlay(render_recipe_body(recipe), recipe)
+            for recipe in recipes]
+
+    def overlay(self, body, recipe):
+        """Fill the per-request fields of a recipe body in place."""
+        if body['image'] is not None:
+            body['image'] = self.request.build_absolute_uri(body['image'])
+        body['image_variants'] = {
+            variant: {
+                ext: self.request.build_absolute_uri(url)
+                for ext, url in formats.items()}
+            for variant, formats in body['image_variants'].items()}
+        body['author'] = dict(
+            body['author'],
+            is_subscribed=body['author']['id'] in self.followed_ids)
+        body['is_favorited'] = get_user_flag(
+            self.request, recipe, 'favorites')
+        body['is_in_shopping_cart'] = get_user_flag(
+            self.request, recipe, 'shopping_cart')
+        return body
+
+
+class CachedRecipeReadPlan(RecipeReadPlan):
+    """RecipeReadPlan taking recipe bodies from the cache.
+
+    Recipes are loaded without relations, which are prefetched for
+    cache misses alone.
+    """
+
+    def render(self, recipes):
+        recipes = list(recipes)
+        keys = get_recipe_body_keys(recipes)
+        bodies = get_recipe_bodies(keys)
+        missing = [recipe for recipe in recipes if recipe.id not in bodies]
+        if missing:
+            prefetch_related_objects(
+                missing, 'author', *Recipe.objects.read_prefetches())
+            new_bodies = {
+                recipe.id: render_recipe_body(recipe) for recipe in missing}
+            set_recipe_bodies(keys, new_bodies)
+            bodies.update(new_bodies)
+        return [self.overlay(bodies[recipe.id], recipe) for recipe in recipes]
@@ -0,0 +1,114 @@
+import binascii
+from base64 import b64decode
+from tempfile import TemporaryFile
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.files import File
+from PIL import Image, UnidentifiedImageError
+from rest_framework import serializers
+
+# Accepted Pillow formats as format -> file extension
+IMAGE_FORMATS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'GIF': 'gif',
+    'WEBP': 'webp',
+}
+# Base64 characters decoded at a time, a multiple of 4
+DECODE_CHUNK_SIZE = 256 * 1024
+# Longest accepted 'data:<mime type>;base64,' prefix
+MAX_HEADER_LENGTH = 100
+
+
+class StreamingBase64ImageField(serializers.ImageField):
+    """Image field taking a base64 data URI, decoded into a temp file.
+
+    Payloads over IMAGE_UPLOAD_MAX_SIZE bytes are refused before
+    decoding and images over IMAGE_UPLOAD_MAX_PIXELS after reading
+    their header, then the whole file is verified. Images larger than
+    IMAGE_MAX_DIMENSION on a side are downscaled when the recipe is
+    saved (api.images.downscale_image).
+    """
+    default_error_messages = {
+        'invalid': 'Upload a valid base64 encoded image.',
+        'max_size': 'Image must not exceed {max_size} bytes.',
+        'max_pixels': 'Image must not exceed {max_pixels} pixels.',
+    }
+
+    def to_internal_value(self, data):
+        if data in ('', None):
+            return None
+        if not isinstance(data, str):
+            self.fail('invalid')
+        start = 0
+        if data.startswith('data:'):
+            start = data.find(',', 0, MAX_HEADER_LENGTH) + 1
+            if not start:
+                self.fail('invalid')
+        max_size = settings.IMAGE_UPLOAD_MAX_SIZE
+        if (len(data) - start) // 4 * 3 > max_size:
+            self.fail('max_size', max_size=max_size)
+        file = self.decode(data, start)
+        try:
+            return self.check_image(file)
+        except BaseException:
+            file.close()
+            raise
+
+    def decode(self, data, start):
+        file = File(TemporaryFile(), name='upload')
+        try:
+            for offset in range(start, len(data), DECODE_CHUNK_SIZE):
+                file.write(b64decode(
+                    data[offset:offset + DECODE_CHUNK_SIZE], validate=True))
+        except (binascii.Error, ValueError):
+            file.close()
+            self.fail('invalid')
+        file.seek(0)
+        return file
+
+    def check_image(self, file):
+        """Validate the image header, then verify the whole file."""
+        try:
+            with Image.open(file.file) as image:
+                if image.format not in IMAGE_FORMATS:
+                    self.fail('invalid')
+                max_pixels = settings.IMAGE_UPLOAD_MAX_PIXELS
+                if image.width * image.height > max_pixels:
+                    self.fail('max_pixels', max_pixels=max_pixels)
+                image_format = image.format
+            # verify() leaves the image unusable, so it gets its own handle.
+            file.seek(0)
+            with Image.open(file.file) as image:
+                image.verify()
+        except (UnidentifiedImageError, Image.DecompressionBombError,
+                OSError, SyntaxError, ValueError):
+            self.fail('invalid')
+        file.seek(0)
+        file.name = f'{uuid4()}.{IMAGE_FORMATS[image_format]}'
+        return file
+
+
+class PrimaryKeyField(serializers.Field):
+    """Primary key checked for type only, for looking up ids in bulk.
+
+    Reports a wrong type like PrimaryKeyRelatedField does; the caller
+    reports ids that do not exist.
+    """
+    default_error_messages = {
+        'incorrect_type': (
+            serializers.PrimaryKeyRelatedField
+            .default_error_messages['incorrect_type']),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return int(data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_representation(self, value):
+        return value
@@ -1,5 +1,8 @@
+from django.db.models import Case, IntegerField, When
 from django_filters.rest_framework import FilterSet, filters
 
+from api.search import search_recipes
+from api.services import get_relation_ids
 from recipes.models import Ingredient, Recipe, Tag
 
 
@@ -21,6 +24,7 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -29,16 +33,26 @@ class RecipeFilter(FilterSet):
             'author',
             'is_favorited',
             'is_in_shopping_cart',
+            'search',
         )
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(
-                recipes_favorite_related__user=self.request.user)
+                id__in=get_relation_ids(self.request, 'favorites'))
         return queryset
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(
-                recipes_shoppingcart_related__user=self.request.user)
+                id__in=get_relation_ids(self.request, 'shopping_cart'))
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        # Declared last, so queryset already has the other filters applied.
+        recipe_ids = search_recipes(value, queryset)
+        return queryset.filter(id__in=recipe_ids).order_by(Case(
+            *(When(id=recipe_id, then=position)
+              for position, recipe_id in enumerate(recipe_ids)),
+            output_field=IntegerField(),
+        ))
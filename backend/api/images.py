@@ -0,0 +1,167 @@
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from io import BytesIO
+from pathlib import PurePosixPath
+from tempfile import TemporaryFile
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.constants import (
+    IMAGE_VARIANT_FORMATS,
+    IMAGE_VARIANT_QUALITY,
+    IMAGE_VARIANT_SIZES,
+)
+from recipes.models import Recipe
+from recipes.storage import image_storage
+
+logger = logging.getLogger(__name__)
+
+DOWNSCALE_QUALITY = 90
+
+executor = None
+executor_lock = threading.Lock()
+
+
+def get_variant_names(image_name):
+    """Return {variant: {extension: storage name}} for an original.
+
+    Names carry the original's content hash and the rendering settings,
+    so a variant is never rewritten with different bytes: changed
+    settings give new names, which needs_variants reports as missing.
+    """
+    path = PurePosixPath(image_name)
+    return {
+        variant: {
+            ext: str(path.parent / 'variants' / (
+                f'{path.stem}_{variant}_{width}x{height}'
+                f'_q{IMAGE_VARIANT_QUALITY}.{ext}'))
+            for ext in IMAGE_VARIANT_FORMATS.values()}
+        for variant, (width, height) in IMAGE_VARIANT_SIZES.items()}
+
+
+def get_variant_urls(variants):
+    """Map stored variant names to relative media URLs."""
+    return {
+        variant: {
+            ext: default_storage.url(name) for ext, name in names.items()}
+        for variant, names in variants.items()}
+
+
+def needs_variants(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants != get_variant_names(recipe.image.name))
+
+
+def downscale_image(file):
+    """Return file, or a downscaled copy if it is over IMAGE_MAX_DIMENSION.
+
+    Animated images are kept as they are. EXIF data is carried over.
+    """
+    max_dimension = settings.IMAGE_MAX_DIMENSION
+    file.seek(0)
+    with Image.open(file) as image:
+        if (
+            max(image.size) <= max_dimension
+            or getattr(image, 'is_animated', False)
+        ):
+            file.seek(0)
+            return file
+        image_format = image.format
+        options = {}
+        if image_format in ('JPEG', 'WEBP'):
+            options = {'quality': DOWNSCALE_QUALITY, 'exif': image.getexif()}
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        resized = File(TemporaryFile(), name=file.name)
+        try:
+            image.save(resized, image_format, **options)
+        except BaseException:
+            resized.close()
+            raise
+    file.close()
+    resized.seek(0)
+    return resized
+
+
+def render_variants(data):
+    """Encode every variant of image bytes; runs in a worker process."""
+    rendered = {}
+    with Image.open(BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        for variant, size in IMAGE_VARIANT_SIZES.items():
+            resized = image.copy()
+            resized.thumbnail(size, Image.LANCZOS)
+            rendered[variant] = {}
+            for image_format, ext in IMAGE_VARIANT_FORMATS.items():
+                converted = resized
+                if image_format == 'JPEG' and resized.mode != 'RGB':
+                    converted = resized.convert('RGB')
+                elif resized.mode not in ('RGB', 'RGBA'):
+                    converted = resized.convert('RGBA')
+                buffer = BytesIO()
+                converted.save(
+                    buffer, image_format,
+                    quality=IMAGE_VARIANT_QUALITY, optimize=True)
+                rendered[variant][ext] = buffer.getvalue()
+    return rendered
+
+
+def save_variants(recipe_id, image_name, rendered):
+    """Store rendered variants and attach them to the recipe.
+
+    The recipe is left untouched if its image changed meanwhile.
+    """
+    names = get_variant_names(image_name)
+    for variant, formats in rendered.items():
+        for ext, content in formats.items():
+            name = names[variant][ext]
+            # A stored variant already has these bytes; see
+            # get_variant_names.
+            if not default_storage.exists(name):
+                default_storage.save(name, ContentFile(content))
+    Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_variants=names, updated=timezone.now())
+
+
+def read_image(image_name):
+    with image_storage.open(image_name, 'rb') as file:
+        return file.read()
+
+
+def get_executor():
+    global executor
+    with executor_lock:
+        if executor is None:
+            executor = ProcessPoolExecutor(
+                max_workers=settings.IMAGE_VARIANT_WORKERS)
+        return executor
+
+
+def finish_variants(recipe_id, image_name, future):
+    try:
+        save_variants(recipe_id, image_name, future.result())
+    except Exception:
+        logger.exception(f'{image_name}: image variants failed')
+    finally:
+        close_old_connections()
+
+
+def schedule_variants(recipe_id, image_name):
+    """Render image variants in the worker pool without blocking."""
+    try:
+        data = read_image(image_name)
+        if not settings.IMAGE_VARIANT_WORKERS:
+            save_variants(recipe_id, image_name, render_variants(data))
+            return
+        future = get_executor().submit(render_variants, data)
+    except Exception:
+        logger.exception(f'{image_name}: image variants failed')
+        return
+    future.add_done_callback(partial(finish_variants, recipe_id, image_name))
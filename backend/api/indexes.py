@@ -0,0 +1,208 @@
+import threading
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.db.models import Max
+
+from api.caches import bump_catalogue_version, get_catalogue_version
+from recipes.models import AmountIngredient, Ingredient, Recipe
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Recipe saves committed this long before the last synced one are
+# re-read, so out-of-order commits are not missed.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+
+def fold_name(name):
+    """Case-fold a name for matching, treating 'ё' as 'е'."""
+    return name.casefold().replace('ё', 'е')
+
+
+class IngredientPrefixIndex:
+    """Process-local autocomplete index over ingredient names.
+
+    Keeps ingredients sorted by their case-folded name, so prefix
+    matches are found with a binary search. Substring matches are
+    appended after them. The index is built lazily and rebuilt when
+    the ingredients catalogue version changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = None
+
+    def _build(self):
+        rows = Ingredient.objects.values('id', 'name', 'measurement_unit')
+        entries = sorted(
+            (fold_name(row['name']), row['id'], row) for row in rows)
+        return (
+            [key for key, _, _ in entries],
+            [row for _, _, row in entries],
+        )
+
+    def _get_entries(self):
+        version = get_catalogue_version('ingredients')
+        with self._lock:
+            if self._version != version:
+                self._entries = self._build()
+                self._version = version
+            return self._entries
+
+    def search(self, query, limit=None):
+        """Return ingredient dicts matching query, prefix matches first."""
+        keys, rows = self._get_entries()
+        query = fold_name(query)
+        start = position = bisect_left(keys, query)
+        while position < len(keys) and keys[position].startswith(query):
+            position += 1
+        result = rows[start:position]
+        if limit is not None and len(result) >= limit:
+            return result[:limit]
+        for index, key in enumerate(keys):
+            if query in key and not start <= index < position:
+                result.append(rows[index])
+                if limit is not None and len(result) >= limit:
+                    break
+        return result
+
+
+class RecipeIngredientIndex:
+    """Process-local ingredient -> recipe posting lists for pantry search.
+
+    Each ingredient maps to a compact array of the recipes using it,
+    one entry per AmountIngredient row, and recipe sizes are kept in an
+    array indexed by recipe id. Counting a pantry's matches touches only
+    the postings of its ingredients, in one bincount pass when numpy is
+    installed. Built lazily and rebuilt in every process when the
+    'pantry' catalogue version is bumped by rebuild_search_index; saves
+    from other processes are picked up from ``Recipe.updated``. Deleted
+    recipes are dropped by the caller's queryset.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._synced = None
+        self._postings = {}
+        self._recipe_ingredients = {}
+        self._sizes = array('H')
+
+    def _remove(self, recipe_id):
+        for ingredient_id in self._recipe_ingredients.pop(recipe_id, ()):
+            posting = self._postings[ingredient_id]
+            posting.remove(recipe_id)
+            if not posting:
+                del self._postings[ingredient_id]
+        if recipe_id < len(self._sizes):
+            self._sizes[recipe_id] = 0
+
+    def _add(self, recipe_id, ingredient_ids):
+        self._recipe_ingredients[recipe_id] = ingredient_ids
+        for ingredient_id in ingredient_ids:
+            self._postings.setdefault(
+                ingredient_id, array('I')).append(recipe_id)
+        if recipe_id >= len(self._sizes):
+            self._sizes.extend(
+                array('H', bytes(2 * (recipe_id + 1 - len(self._sizes)))))
+        self._sizes[recipe_id] = len(ingredient_ids)
+
+    def _load(self, recipes):
+        """Replace the postings of recipes with their stored ingredients."""
+        synced = recipes.aggregate(updated=Max('updated'))['updated']
+        if self._recipe_ingredients:
+            for recipe_id in recipes.values_list('id', flat=True):
+                self._remove(recipe_id)
+        rows = AmountIngredient.objects.filter(
+            recipe__in=recipes.values('id')
+        ).values_list('recipe_id', 'ingredient_id').order_by('recipe_id')
+        for recipe_id, group in groupby(rows.iterator(), key=itemgetter(0)):
+            self._add(recipe_id, tuple(
+                ingredient_id for _, ingredient_id in group))
+        if synced is not None and (
+                self._synced is None or synced > self._synced):
+            self._synced = synced
+
+    def _sync(self):
+        version = get_catalogue_version('pantry')
+        if self._version != version:
+            self._postings, self._recipe_ingredients = {}, {}
+            self._sizes, self._synced = array('H'), None
+            self._load(Recipe.objects.all())
+            self._version = version
+        elif self._synced is None:
+            self._load(Recipe.objects.all())
+        else:
+            self._load(Recipe.objects.filter(
+                updated__gte=self._synced - SYNC_OVERLAP))
+
+    def index(self, recipe_ids):
+        """Re-index recipes, dropping the ones that no longer exist."""
+        with self._lock:
+            if self._version is None:
+                return
+            for recipe_id in recipe_ids:
+                self._remove(recipe_id)
+            self._load(Recipe.objects.filter(pk__in=recipe_ids))
+
+    def rebuild(self):
+        bump_catalogue_version('pantry')
+        with self._lock:
+            self._sync()
+            return len(self._recipe_ingredients)
+
+    def match(self, ingredient_ids, min_coverage=0):
+        """Rank recipes by the share of their ingredients in a pantry.
+
+        Returns (recipe id, coverage) pairs, best covered first, then
+        by the number of matched ingredients and newest recipe.
+        """
+        with self._lock:
+            self._sync()
+            postings = [
+                self._postings[ingredient_id]
+                for ingredient_id in set(ingredient_ids)
+                if ingredient_id in self._postings]
+            if not postings:
+                return []
+            if numpy is not None:
+                return self._rank_arrays(postings, min_coverage)
+            matched = Counter()
+            for posting in postings:
+                matched.update(posting)
+            ranked = []
+            for recipe_id, count in matched.items():
+                coverage = count / self._sizes[recipe_id]
+                if coverage >= min_coverage:
+                    ranked.append((coverage, count, recipe_id))
+        ranked.sort(reverse=True)
+        return [(recipe_id, coverage) for coverage, _, recipe_id in ranked]
+
+    def _rank_arrays(self, postings, min_coverage):
+        sizes = numpy.frombuffer(self._sizes, dtype=numpy.uint16)
+        counts = numpy.bincount(
+            numpy.concatenate([
+                numpy.frombuffer(posting, dtype=numpy.uint32)
+                for posting in postings]),
+            minlength=len(sizes))
+        recipe_ids = numpy.flatnonzero(counts)
+        counts = counts[recipe_ids]
+        coverages = counts / sizes[recipe_ids]
+        keep = coverages >= min_coverage
+        recipe_ids, counts, coverages = (
+            recipe_ids[keep], counts[keep], coverages[keep])
+        order = numpy.lexsort((-recipe_ids, -counts, -coverages))
+        return list(zip(
+            recipe_ids[order].tolist(), coverages[order].tolist()))
+
+
+ingredient_index = IngredientPrefixIndex()
+recipe_ingredient_index = RecipeIngredientIndex()
@@ -0,0 +1,77 @@
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_read import RecipeReadPlan
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import RecipeReadSerializer
+from recipes.models import Recipe
+from users.models import User
+
+DEFAULT_PAGE_SIZES = (6, 24, 100, 500)
+
+
+class Command(BaseCommand):
+    help = 'Compare serializer and fast read path rendering of recipe pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--page-sizes', type=int, nargs='+', default=DEFAULT_PAGE_SIZES,
+            help='Page sizes to benchmark')
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Number of renderings per page size')
+        parser.add_argument(
+            '--user', help='Email of the user viewing the recipes')
+
+    def handle(self, *args, **kwargs):
+        request = Request(APIRequestFactory().get(
+            '/api/recipes/', SERVER_NAME=self.get_server_name()))
+        request.user = AnonymousUser()
+        if kwargs['user']:
+            try:
+                request.user = User.objects.get(email=kwargs['user'])
+            except User.DoesNotExist:
+                raise CommandError('User not found')
+        if orjson is None:
+            self.stdout.write('orjson is not installed, using stdlib json')
+        self.stdout.write(
+            f'{"page":>6} {"serializer ms":>14} {"fast ms":>8} {"speedup":>8}')
+        for page_size in kwargs['page_sizes']:
+            recipes = list(
+                Recipe.objects.with_read_relations()[:page_size])
+            if not recipes:
+                raise CommandError('No recipes to render')
+            slow, slow_body = self.measure(kwargs['repeat'], lambda: (
+                JSONRenderer().render(RecipeReadSerializer(
+                    recipes, many=True, context={'request': request}).data)))
+            fast, fast_body = self.measure(kwargs['repeat'], lambda: (
+                FastJSONRenderer().render(
+                    RecipeReadPlan(request).render(recipes))))
+            if slow_body != fast_body:
+                raise CommandError(
+                    f'Outputs differ for page size {page_size}')
+            self.stdout.write(
+                f'{len(recipes):>6} {slow * 1000:>14.2f} '
+                f'{fast * 1000:>8.2f} {slow / fast:>7.1f}x')
+
+    @staticmethod
+    def get_server_name():
+        """Return a host that passes ALLOWED_HOSTS validation."""
+        host = next(iter(settings.ALLOWED_HOSTS), '*')
+        return 'localhost' if host == '*' else host.lstrip('.')
+
+    @staticmethod
+    def measure(repeat, render):
+        """Return the best time of repeated renderings and the output."""
+        best = float('inf')
+        for _ in range(repeat):
+            started = perf_counter()
+            body = render()
+            best = min(best, perf_counter() - started)
+        return best, body
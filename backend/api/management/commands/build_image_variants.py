@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.images import (
+    needs_variants,
+    read_image,
+    render_variants,
+    save_variants,
+)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Render missing resized variants of recipe images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count(),
+            help='Number of rendering processes')
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Render variants of every image, not only missing ones; '
+                 'variant files that exist are kept')
+
+    def handle(self, *args, **kwargs):
+        workers = kwargs['workers']
+        if workers < 1:
+            raise CommandError('Number of workers must be positive')
+        recipes = (
+            recipe for recipe in Recipe.objects.exclude(image='').only(
+                'id', 'image', 'image_variants').iterator()
+            if kwargs['force'] or needs_variants(recipe))
+        built = failed = 0
+        pending = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            while True:
+                # Keep a bounded number of originals in memory at once.
+                for recipe in recipes:
+                    try:
+                        data = read_image(recipe.image.name)
+                    except OSError as error:
+                        self.stderr.write(f'{recipe.image.name}: {error}')
+                        failed += 1
+                        continue
+                    future = pool.submit(render_variants, data)
+                    pending[future] = (recipe.id, recipe.image.name)
+                    if len(pending) >= workers * 2:
+                        break
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    recipe_id, image_name = pending.pop(future)
+                    try:
+                        save_variants(recipe_id, image_name, future.result())
+                    except Exception as error:
+                        self.stderr.write(f'{image_name}: {error}')
+                        failed += 1
+                    else:
+                        built += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'image variants: {built} built, {failed} failed'))
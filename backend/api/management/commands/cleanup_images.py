@@ -0,0 +1,63 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from api.images import get_variant_names
+from recipes.models import Recipe
+from recipes.storage import image_storage
+
+IMAGES_DIR = 'recipes/images'
+
+
+def iter_files(storage, path):
+    directories, files = storage.listdir(path)
+    for name in files:
+        yield posixpath.join(path, name)
+    for directory in directories:
+        yield from iter_files(storage, posixpath.join(path, directory))
+
+
+class Command(BaseCommand):
+    help = 'Delete recipe images and image variants no recipe references'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=60 * 60,
+            help='Keep files modified less than this many seconds ago')
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report orphaned files')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['min_age'] < 0:
+            raise CommandError('Minimum age must not be negative')
+        if not image_storage.exists(IMAGES_DIR):
+            self.stdout.write('no recipe images stored')
+            return
+        # Files saved after this moment may belong to unfinished uploads.
+        cutoff = timezone.now() - timedelta(seconds=kwargs['min_age'])
+        referenced = set()
+        for image_name in Recipe.objects.exclude(image='').values_list(
+                'image', flat=True).iterator():
+            referenced.add(image_name)
+            for names in get_variant_names(image_name).values():
+                referenced.update(names.values())
+        count = size = 0
+        for name in iter_files(image_storage, IMAGES_DIR):
+            if (
+                name in referenced
+                or image_storage.get_modified_time(name) >= cutoff
+            ):
+                continue
+            file_size = image_storage.size(name)
+            if (
+                kwargs['dry_run']
+                or image_storage.delete_if_older(name, cutoff)
+            ):
+                count += 1
+                size += file_size
+        action = 'found' if kwargs['dry_run'] else 'deleted'
+        self.stdout.write(self.style.SUCCESS(
+            f'orphaned images: {count} {action}, {size} bytes'))
@@ -0,0 +1,19 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand
+
+from api.indexes import recipe_ingredient_index
+from api.search import get_configured_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the recipe full-text and pantry search indexes'
+
+    def handle(self, *args, **kwargs):
+        for backend in (
+                get_configured_search_backend(), recipe_ingredient_index):
+            started = perf_counter()
+            count = backend.rebuild()
+            self.stdout.write(self.style.SUCCESS(
+                f'{type(backend).__name__}: {count} recipes indexed '
+                f'in {perf_counter() - started:.2f}s'))
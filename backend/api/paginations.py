@@ -1,5 +1,86 @@
+from base64 import b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class RecipePagination(CustomPagination):
+    """Page number pagination with an opt-in keyset (cursor) mode.
+
+    Passing ``cursor`` (empty for the first page) switches to seeking
+    on ``(pub_date, id)``: no COUNT and no OFFSET, only an index range
+    scan from the last row of the previous page. Ranked results, such
+    as searches, keep page numbers, as seeking would drop their order.
+    """
+    cursor_query_param = 'cursor'
+    ranked_query_params = ('search',)
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (
+            self.cursor_query_param in request.query_params
+            and not any(
+                request.query_params.get(param)
+                for param in self.ranked_query_params))
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+        queryset = queryset.order_by('-pub_date', '-id')
+        if position:
+            pub_date, pk = position
+            queryset = queryset.filter(pub_date__lte=pub_date).filter(
+                Q(pub_date__lt=pub_date) | Q(id__lt=pk))
+        page = list(queryset[:page_size + 1])
+        self.has_next = len(page) > page_size
+        del page[page_size:]
+        self.last_recipe = page[-1] if page else None
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_cursor_link(),
+            'results': data,
+        })
+
+    def get_next_cursor_link(self):
+        if not self.has_next:
+            return None
+        cursor = self.encode_cursor(
+            self.last_recipe.pub_date, self.last_recipe.id)
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param, cursor)
+
+    @staticmethod
+    def encode_cursor(pub_date, pk):
+        position = f'{pub_date.isoformat()}|{pk}'
+        return urlsafe_b64encode(position.encode('ascii')).decode('ascii')
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = b64decode(
+                cursor.encode('ascii'), altchars=b'-_', validate=True
+            ).decode('ascii').split('|')
+            pub_date = parse_datetime(pub_date)
+            pk = int(pk)
+        except (BinasciiError, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
@@ -0,0 +1,329 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Prefetch
+
+from api.caches import bump_catalogue_version, get_catalogue_version
+from api.indexes import fold_name
+from recipes.models import Ingredient, Recipe
+
+# Searchable recipe fields and their BM25 weights, in FTS5 column order
+SEARCH_FIELDS = (
+    ('name', 3.0),
+    ('ingredients', 2.0),
+    ('text', 1.0),
+)
+# Most recipe ids a search returns, best ranked first, counted after the
+# other recipe filters
+SEARCH_MAX_RESULTS = 1000
+# Largest number of ranked ids checked against the other filters at once
+SEARCH_MAX_FILTER_CHUNK_SIZE = 8000
+# Recipes indexed per query when the whole index is rebuilt
+SEARCH_BUILD_CHUNK_SIZE = 2000
+# Recipe saves committed this long before the last synced one are
+# re-read, so out-of-order commits are not missed.
+SEARCH_SYNC_OVERLAP = timedelta(seconds=5)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+WORD_RE = re.compile(r'\w+')
+RV_RE = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+PERFECTIVE_GERUND_RE = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$')
+REFLEXIVE_RE = re.compile(r'(с[яь])$')
+ADJECTIVE_RE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$')
+PARTICIPLE_RE = re.compile(
+    r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+VERB_RE = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|'
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$')
+NOUN_RE = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$')
+DERIVATIONAL_RE = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+DERIVATIONAL_SUFFIX_RE = re.compile(r'ость?$')
+SUPERLATIVE_RE = re.compile(r'(ейше|ейш)$')
+
+
+def stem(word):
+    """Strip Russian inflections from a case-folded word (Porter)."""
+    match = RV_RE.match(word)
+    if match is None:
+        return word
+    start, rv = match.groups()
+    stripped = PERFECTIVE_GERUND_RE.sub('', rv, 1)
+    if stripped == rv:
+        rv = REFLEXIVE_RE.sub('', rv, 1)
+        stripped = ADJECTIVE_RE.sub('', rv, 1)
+        if stripped != rv:
+            rv = PARTICIPLE_RE.sub('', stripped, 1)
+        else:
+            stripped = VERB_RE.sub('', rv, 1)
+            rv = NOUN_RE.sub('', rv, 1) if stripped == rv else stripped
+    else:
+        rv = stripped
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    if DERIVATIONAL_RE.match(rv):
+        rv = DERIVATIONAL_SUFFIX_RE.sub('', rv, 1)
+    if rv.endswith('ь'):
+        rv = rv[:-1]
+    else:
+        rv = SUPERLATIVE_RE.sub('', rv, 1)
+        if rv.endswith('нн'):
+            rv = rv[:-1]
+    return start + rv
+
+
+def tokenize(text):
+    """Split text into stemmed search terms."""
+    return [stem(word) for word in WORD_RE.findall(fold_name(text))]
+
+
+def get_recipe_documents(queryset):
+    """Yield (recipe, {field: terms}) for recipes of a queryset."""
+    recipes = queryset.only('id', 'name', 'text', 'updated').prefetch_related(
+        Prefetch('ingredients', queryset=Ingredient.objects.only('name')))
+    for recipe in recipes.iterator(chunk_size=SEARCH_BUILD_CHUNK_SIZE):
+        yield recipe, {
+            'name': tokenize(recipe.name),
+            'ingredients': tokenize(' '.join(
+                ingredient.name for ingredient in recipe.ingredients.all())),
+            'text': tokenize(recipe.text),
+        }
+
+
+class FTS5SearchBackend:
+    """Recipe search over an SQLite FTS5 table of stemmed terms.
+
+    The table is built by rebuild_search_index; until then searches go
+    to the in-memory index. Rows are keyed by recipe id and ranked with
+    FTS5's weighted bm25().
+    """
+    table = 'recipes_search'
+
+    def __init__(self):
+        self._ready = False
+
+    def is_ready(self):
+        if not self._ready:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE name = %s",
+                    [self.table])
+                self._ready = cursor.fetchone() is not None
+        return self._ready
+
+    def _insert(self, cursor, queryset):
+        columns = ', '.join(field for field, _ in SEARCH_FIELDS)
+        placeholders = ', '.join(['%s'] * (len(SEARCH_FIELDS) + 1))
+        count = 0
+        for recipe, document in get_recipe_documents(queryset):
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {columns}) '
+                f'VALUES ({placeholders})',
+                [recipe.id, *(
+                    ' '.join(document[field]) for field, _ in SEARCH_FIELDS)])
+            count += 1
+        return count
+
+    def index(self, recipe_ids):
+        """Re-index recipes, dropping the ones that no longer exist."""
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [[recipe_id] for recipe_id in recipe_ids])
+            self._insert(cursor, Recipe.objects.filter(pk__in=recipe_ids))
+
+    def rebuild(self):
+        columns = ', '.join(field for field, _ in SEARCH_FIELDS)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE {self.table} '
+                f'USING fts5({columns}, '
+                f"tokenize='unicode61 remove_diacritics 0')")
+            count = self._insert(cursor, Recipe.objects.all())
+        self._ready = True
+        return count
+
+    def search(self, terms):
+        weights = ', '.join(str(weight) for _, weight in SEARCH_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, {weights})',
+                [' '.join(f'"{term}"' for term in terms)])
+            return [row[0] for row in cursor.fetchall()]
+
+
+class InvertedSearchIndex:
+    """Process-local inverted index over recipes, ranked with BM25F.
+
+    Built lazily and rebuilt when the 'search' catalogue version is
+    bumped. Saves made in this process are indexed at once; saves made
+    by other processes are picked up from ``Recipe.updated`` before
+    each search. Deleted recipes are dropped by the caller's queryset.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._synced = None
+        self._postings = {}
+        self._documents = {}
+        self._total_length = 0.0
+
+    def _add(self, recipe, document):
+        self._remove(recipe.id)
+        frequencies = Counter()
+        for field, weight in SEARCH_FIELDS:
+            for term in document[field]:
+                frequencies[term] += weight
+        length = sum(frequencies.values())
+        self._documents[recipe.id] = (frequencies, length)
+        self._total_length += length
+        for term, frequency in frequencies.items():
+            self._postings.setdefault(term, {})[recipe.id] = frequency
+        if self._synced is None or recipe.updated > self._synced:
+            self._synced = recipe.updated
+
+    def _remove(self, recipe_id):
+        frequencies, length = self._documents.pop(recipe_id, ({}, 0))
+        self._total_length -= length
+        for term in frequencies:
+            postings = self._postings[term]
+            del postings[recipe_id]
+            if not postings:
+                del self._postings[term]
+
+    def _index_queryset(self, queryset):
+        for recipe, document in get_recipe_documents(queryset):
+            self._add(recipe, document)
+
+    def _sync(self):
+        version = get_catalogue_version('search')
+        if self._version != version:
+            self._postings, self._documents = {}, {}
+            self._total_length, self._synced = 0.0, None
+            self._index_queryset(Recipe.objects.all())
+            self._version = version
+        elif self._synced is None:
+            self._index_queryset(Recipe.objects.all())
+        else:
+            self._index_queryset(Recipe.objects.filter(
+                updated__gte=self._synced - SEARCH_SYNC_OVERLAP))
+
+    def index(self, recipe_ids):
+        """Re-index recipes, dropping the ones that no longer exist."""
+        with self._lock:
+            if self._version is None:
+                return
+            for recipe_id in recipe_ids:
+                self._remove(recipe_id)
+            self._index_queryset(Recipe.objects.filter(pk__in=recipe_ids))
+
+    def is_ready(self):
+        return True
+
+    def rebuild(self):
+        bump_catalogue_version('search')
+        with self._lock:
+            self._sync()
+            return len(self._documents)
+
+    def search(self, terms):
+        with self._lock:
+            self._sync()
+            postings = []
+            for term in set(terms):
+                if term not in self._postings:
+                    return []
+                postings.append(self._postings[term])
+            # Intersect starting from the rarest term.
+            postings.sort(key=len)
+            candidates = [
+                recipe_id for recipe_id in postings[0]
+                if all(recipe_id in posting for posting in postings[1:])]
+            total = len(self._documents)
+            average_length = self._total_length / total
+            weighted = [
+                (math.log(1 + (total - len(posting) + 0.5)
+                          / (len(posting) + 0.5)), posting)
+                for posting in postings]
+
+            def score(recipe_id):
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * (
+                    self._documents[recipe_id][1] / average_length))
+                return sum(
+                    idf * posting[recipe_id] * (BM25_K1 + 1)
+                    / (posting[recipe_id] + norm)
+                    for idf, posting in weighted)
+
+            ranked = [
+                (-score(recipe_id), recipe_id) for recipe_id in candidates]
+        # Callers usually stop after the first results, so the ranking
+        # is popped lazily from a heap rather than fully sorted.
+        heapq.heapify(ranked)
+        while ranked:
+            yield heapq.heappop(ranked)[1]
+
+
+SEARCH_BACKENDS = {
+    'fts5': FTS5SearchBackend(),
+    'python': InvertedSearchIndex(),
+}
+
+
+def get_configured_search_backend():
+    name = settings.RECIPE_SEARCH_BACKEND
+    if name == 'auto':
+        name = 'fts5' if connection.vendor == 'sqlite' else 'python'
+    return SEARCH_BACKENDS[name]
+
+
+def get_search_backend():
+    """Return the configured backend, the in-memory one until it is built."""
+    backend = get_configured_search_backend()
+    return backend if backend.is_ready() else SEARCH_BACKENDS['python']
+
+
+def filter_ranked_ids(ranked_ids, queryset, chunk_size):
+    """Yield ranked recipe ids that queryset contains, keeping their order.
+
+    Ids are checked in chunks that double up to
+    SEARCH_MAX_FILTER_CHUNK_SIZE, so a caller stopping after the first
+    results reads only the chunks it needed.
+    """
+    ranked_ids = iter(ranked_ids)
+    while True:
+        chunk = list(islice(ranked_ids, chunk_size))
+        if not chunk:
+            return
+        matching = set(
+            queryset.filter(id__in=chunk).values_list('id', flat=True))
+        yield from (recipe_id for recipe_id in chunk if recipe_id in matching)
+        chunk_size = min(chunk_size * 2, SEARCH_MAX_FILTER_CHUNK_SIZE)
+
+
+def search_recipes(query, queryset, limit=SEARCH_MAX_RESULTS):
+    """Return ids of recipes matching every query term, best first.
+
+    The limit counts only recipes that pass the filters of queryset.
+    """
+    terms = tokenize(query)
+    if not terms:
+        return []
+    return list(islice(filter_ranked_ids(
+        get_search_backend().search(terms), queryset, limit), limit))
@@ -2,7 +2,16 @@ from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, status
 
-from recipes.constants import MAX_AMOUNT, MIN_AMOUNT
+from api.fields import PrimaryKeyField, StreamingBase64ImageField
+from api.images import get_variant_urls
+from api.services import get_followed_author_ids, get_relation_ids
+from recipes.cart_totals import track_recipe_amounts
+from recipes.constants import (
+    MAX_AMOUNT,
+    MAX_BULK_RECIPES,
+    MAX_PANTRY_INGREDIENTS,
+    MIN_AMOUNT,
+)
 from recipes.models import (
     AmountIngredient,
     Favorite,
@@ -13,6 +22,15 @@ from recipes.models import (
 )
 from users.models import Subscription, User
 
+DOES_NOT_EXIST_MESSAGE = (
+    serializers.PrimaryKeyRelatedField
+    .default_error_messages['does_not_exist'])
+
+
+def get_user_flag(request, recipe, relation):
+    """Return whether the recipe is in the request user's relation set."""
+    return recipe.id in get_relation_ids(request, relation)
+
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for User model."""
@@ -27,15 +45,12 @@ class UserSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
-        is_subscribed = (
-            request.user.is_authenticated
-            and request.user.followed_users.filter(author=obj).exists())
-        return is_subscribed
+        return obj.id in get_followed_author_ids(request)
 
 
 class SubscribeSerializer(UserSerializer):
     """Serializer for subscriptions."""
-    recipes_count = serializers.ReadOnlyField(source='recipes.count')
+    recipes_count = serializers.ReadOnlyField()
     recipes = serializers.SerializerMethodField()
 
     class Meta(UserSerializer.Meta):
@@ -44,10 +59,12 @@ class SubscribeSerializer(UserSerializer):
         read_only_fields = ('email', 'username', 'first_name', 'last_name')
 
     def get_recipes(self, obj):
-        queryset = obj.recipes.all()
-        recipes_limit = self.context['request'].GET.get('recipes_limit')
-        if recipes_limit and recipes_limit.isdigit():
-            queryset = queryset[: int(recipes_limit)]
+        queryset = getattr(obj, 'limited_recipes', None)
+        if queryset is None:
+            queryset = obj.recipes.all()
+            recipes_limit = self.context['request'].GET.get('recipes_limit')
+            if recipes_limit and recipes_limit.isdigit():
+                queryset = queryset[: int(recipes_limit)]
         recipes = RecipeShortSerializer(
             queryset, many=True,
             context=self.context)
@@ -56,31 +73,21 @@ class SubscribeSerializer(UserSerializer):
 
 class SubscribeCreateSerializer(serializers.ModelSerializer):
     """Serializer for subscription creating."""
+    target_field = 'author'
+    already_exists_message = 'already subscribed'
+    does_not_exist_message = 'no such subscribe'
+
     class Meta:
         model = Subscription
         fields = ('user', 'author')
 
     def validate(self, data):
-        author_id = data.get('author').id
-        user_id = data.get('user').id
-        if user_id == author_id:
+        if data.get('user').id == data.get('author').id:
             raise serializers.ValidationError(
                 detail='you cannot subscribe to yourself',
                 code=status.HTTP_400_BAD_REQUEST)
-        if Subscription.objects.filter(
-                author=author_id, user=user_id).exists():
-            raise serializers.ValidationError(
-                detail='already subscribed',
-                code=status.HTTP_400_BAD_REQUEST)
         return data
 
-    def validate_for_delete(self, author_id, user_id):
-        if not Subscription.objects.filter(
-                author=author_id, user=user_id).exists():
-            raise serializers.ValidationError(
-                detail='no such subscribe',
-                code=status.HTTP_400_BAD_REQUEST)
-
     def to_representation(self, instance):
         return SubscribeSerializer(
             instance=instance.author,
@@ -115,8 +122,7 @@ class AmountIngredientSerializer(serializers.ModelSerializer):
 
 class CreateAmountIngredientSerializer(serializers.ModelSerializer):
     """Serializer for ingredient amount creation."""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(), )
+    id = PrimaryKeyField()
     amount = serializers.IntegerField(
         min_value=MIN_AMOUNT,
         max_value=MAX_AMOUNT,
@@ -129,9 +135,25 @@ class CreateAmountIngredientSerializer(serializers.ModelSerializer):
         model = AmountIngredient
 
 
+class ImageVariantsField(serializers.ReadOnlyField):
+    """URLs of resized image variants, empty until they are rendered."""
+
+    def to_representation(self, variants):
+        urls = get_variant_urls(variants)
+        request = self.context.get('request')
+        if request is not None:
+            urls = {
+                variant: {
+                    ext: request.build_absolute_uri(url)
+                    for ext, url in formats.items()}
+                for variant, formats in urls.items()}
+        return urls
+
+
 class RecipeReadSerializer(serializers.ModelSerializer):
     """Serializer for recipe reading."""
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     ingredients = AmountIngredientSerializer(
@@ -144,31 +166,23 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             'id', 'name',
-            'text', 'cooking_time', 'image',
+            'text', 'cooking_time', 'image', 'image_variants',
             'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart')
 
     def get_is_favorited(self, obj):
-        request = self.context.get('request')
-        is_favorited = (request.user.is_authenticated and getattr(
-            request.user, 'recipes_favorite_related')
-            .filter(recipe=obj).exists())
-        return is_favorited
+        return get_user_flag(self.context.get('request'), obj, 'favorites')
 
     def get_is_in_shopping_cart(self, obj):
-        request = self.context.get('request')
-        is_in_shopping_cart = (request.user.is_authenticated and getattr(
-            request.user, 'recipes_shoppingcart_related')
-            .filter(recipe=obj).exists())
-        return is_in_shopping_cart
+        return get_user_flag(
+            self.context.get('request'), obj, 'shopping_cart')
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
     """Serializer for recipe creation."""
-    image = Base64ImageField()
+    image = StreamingBase64ImageField()
     author = UserSerializer(read_only=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(), many=True)
+    tags = serializers.ListField(child=PrimaryKeyField())
     ingredients = CreateAmountIngredientSerializer(many=True, write_only=True)
     cooking_time = serializers.IntegerField(
         min_value=MIN_AMOUNT,
@@ -206,6 +220,29 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 code=status.HTTP_400_BAD_REQUEST)
         return data
 
+    def validate_tags(self, tag_ids):
+        tags = Tag.objects.in_bulk(tag_ids)
+        missing_ids = [tag_id for tag_id in tag_ids if tag_id not in tags]
+        if missing_ids:
+            raise serializers.ValidationError([
+                DOES_NOT_EXIST_MESSAGE.format(pk_value=tag_id)
+                for tag_id in missing_ids], code='does_not_exist')
+        return [tags[tag_id] for tag_id in tag_ids]
+
+    def validate_ingredients(self, ingredients):
+        found = Ingredient.objects.in_bulk(
+            [ingredient['id'] for ingredient in ingredients])
+        errors = [
+            {} if ingredient['id'] in found else {
+                'id': [DOES_NOT_EXIST_MESSAGE.format(
+                    pk_value=ingredient['id'])]}
+            for ingredient in ingredients]
+        if any(errors):
+            raise serializers.ValidationError(errors, code='does_not_exist')
+        for ingredient in ingredients:
+            ingredient['id'] = found[ingredient['id']]
+        return ingredients
+
     def validate_image(self, image):
         if not image:
             raise serializers.ValidationError(
@@ -233,49 +270,64 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         self.create_ingredients(recipe, ingredients)
         return recipe
 
+    @staticmethod
+    def update_ingredients(recipe, ingredients):
+        """Write only the ingredient amounts that differ from stored ones."""
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients}
+        to_delete = []
+        to_update = []
+        for amount_ingredient in recipe.recipe_ingredient.all():
+            amount = amounts.pop(amount_ingredient.ingredient_id, None)
+            if amount is None:
+                to_delete.append(amount_ingredient.id)
+            elif amount != amount_ingredient.amount:
+                amount_ingredient.amount = amount
+                to_update.append(amount_ingredient)
+        if to_delete:
+            AmountIngredient.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            AmountIngredient.objects.bulk_update(to_update, ('amount',))
+        if amounts:
+            AmountIngredient.objects.bulk_create(
+                AmountIngredient(
+                    recipe=recipe, ingredient_id=ingredient_id, amount=amount)
+                for ingredient_id, amount in amounts.items())
+
     @transaction.atomic
     def update(self, instance, validated_data):
-        instance.tags.clear()
         instance.tags.set(validated_data.pop('tags'))
-        instance.ingredients.clear()
-        ingredients = validated_data.pop('ingredients')
-        self.create_ingredients(instance, ingredients)
+        with track_recipe_amounts([instance.id]):
+            self.update_ingredients(
+                instance, validated_data.pop('ingredients'))
         return super().update(instance, validated_data)
 
     def to_representation(self, recipe):
+        recipe = Recipe.objects.with_read_relations().get(pk=recipe.pk)
         return RecipeReadSerializer(recipe, context=self.context).data
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
     """Serializer for recipe short view."""
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'cooking_time', 'image')
+        fields = ('id', 'name', 'cooking_time', 'image', 'image_variants')
 
 
 class ShoppingCartCreateDeleteSerializer(serializers.ModelSerializer):
     """Serializer for shopping cart."""
+    target_field = 'recipe'
+    already_exists_message = 'it has already been added'
+    does_not_exist_message = 'no such recipe'
+
     class Meta:
         model = ShoppingCart
         fields = ('user', 'recipe')
 
-    def validate(self, data):
-        user_id = data.get('user').id
-        recipe_id = data.get('recipe').id
-        if self.Meta.model.objects.filter(user=user_id,
-                                          recipe=recipe_id).exists():
-            raise serializers.ValidationError('it has already been added')
-        return data
-
-    def validate_for_delete(self, user_id, recipe_id):
-        if not self.Meta.model.objects.filter(
-                user_id=user_id, recipe_id=recipe_id).exists():
-            raise serializers.ValidationError(
-                detail='no such recipe',
-                code=status.HTTP_400_BAD_REQUEST)
-
     def to_representation(self, instance):
         serializer = RecipeShortSerializer(
             instance.recipe, context=self.context)
@@ -286,3 +338,21 @@ class FavoriteCreateDeleteSerializer(ShoppingCartCreateDeleteSerializer):
     """Serializer for favorite recipes."""
     class Meta(ShoppingCartCreateDeleteSerializer.Meta):
         model = Favorite
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Serializer for a batch of recipe ids."""
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_AMOUNT),
+        allow_empty=False,
+        max_length=MAX_BULK_RECIPES)
+
+
+class PantrySerializer(serializers.Serializer):
+    """Serializer for pantry search parameters."""
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=MIN_AMOUNT),
+        allow_empty=False,
+        max_length=MAX_PANTRY_INGREDIENTS)
+    min_coverage = serializers.FloatField(
+        min_value=0, max_value=1, default=0)
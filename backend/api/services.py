@@ -1,24 +1,195 @@
-from io import StringIO
-
-from django.db.models import Sum
-
-from recipes.models import AmountIngredient
-
-
-def generate_shopping_cart_text(request):
-    text_stream = StringIO()
-    text_stream.write('Список покупок\n')
-    text_stream.write('Ингредиент - Единица измерения - Количество\n')
-    shopping_cart = (
-        AmountIngredient.objects.select_related('recipe', 'ingredient')
-        .filter(recipe__recipes_shoppingcart_related__user=request.user)
-        .values_list(
-            'ingredient__name',
-            'ingredient__measurement_unit')
-        .annotate(amount=Sum('amount'))
-        .order_by('ingredient__name')
-    )
-    lines = (' - '.join(str(field) for field in item) + '\n'
-             for item in shopping_cart)
-    text_stream.writelines(lines)
-    return text_stream.getvalue()
+import csv
+from functools import lru_cache
+from pathlib import Path
+
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from api.caches import get_user_relation_ids
+from api.indexes import fold_name
+from recipes.models import ShoppingCartIngredient
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+SHOPPING_CART_TITLE = 'Список покупок'
+SHOPPING_CART_HEADER = ('Ингредиент', 'Единица измерения', 'Количество')
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_FONT_SIZE = 11
+PDF_LINE_HEIGHT = 16
+PDF_MARGIN = 50
+# Measurement unit -> (base unit, multiplier to the base unit)
+UNIT_CONVERSIONS = {
+    'мг': ('г', 0.001),
+    'г': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+}
+# Base unit -> (display unit, size in base units), largest first
+DISPLAY_UNITS = {
+    'г': (('кг', 1000),),
+    'мл': (('л', 1000),),
+}
+AMOUNT_PRECISION = 3
+
+
+def to_display_unit(base_unit, amount):
+    """Express an amount in the largest display unit it fills."""
+    for unit, factor in DISPLAY_UNITS.get(base_unit, ()):
+        if amount >= factor:
+            return unit, amount / factor
+    return base_unit, amount
+
+
+def format_amount(amount):
+    amount = round(amount, AMOUNT_PRECISION)
+    return int(amount) if amount == int(amount) else amount
+
+
+def sum_by_code(codes, amounts, factors, size):
+    """Sum amounts scaled by factors into size buckets indexed by codes."""
+    if numpy is not None:
+        return numpy.bincount(
+            numpy.asarray(codes, dtype=numpy.intp),
+            weights=(numpy.asarray(amounts, dtype=numpy.float64)
+                     * numpy.asarray(factors, dtype=numpy.float64)),
+            minlength=size,
+        ).tolist()
+    totals = [0] * size
+    for code, amount, factor in zip(codes, amounts, factors):
+        totals[code] += amount * factor
+    return totals
+
+
+def aggregate_ingredients(rows):
+    """Merge (group, name, unit, amount) rows across convertible units.
+
+    Names are matched case-insensitively within a group, amounts are
+    converted to base units, summed in one pass and shown in a display
+    unit. Returns rows of the same shape sorted by group and name.
+    """
+    keys = {}
+    entries = []
+    codes = []
+    amounts = []
+    factors = []
+    for group, name, unit, amount in rows:
+        base_unit, factor = UNIT_CONVERSIONS.get(unit, (unit, 1))
+        key = (group, fold_name(name), base_unit)
+        code = keys.get(key)
+        if code is None:
+            code = keys[key] = len(entries)
+            entries.append((group, name, base_unit))
+        codes.append(code)
+        amounts.append(amount)
+        factors.append(factor)
+    totals = sum_by_code(codes, amounts, factors, len(entries))
+    result = []
+    for (group, name, base_unit), total in zip(entries, totals):
+        unit, amount = to_display_unit(base_unit, total)
+        result.append((group, name, unit, format_amount(amount)))
+    result.sort(key=lambda row: (row[0], fold_name(row[1])))
+    return result
+
+
+def get_shopping_carts(user_ids):
+    """Return {user id: [(name, unit, amount), ...]} for the given users."""
+    shopping_carts = {}
+    rows = ShoppingCartIngredient.objects.filter(
+        user_id__in=user_ids
+    ).values_list(
+        'user_id',
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount',
+    ).order_by()
+    for user_id, *item in aggregate_ingredients(rows.iterator()):
+        shopping_carts.setdefault(user_id, []).append(tuple(item))
+    return shopping_carts
+
+
+def get_shopping_cart(user):
+    """Return (name, measurement unit, amount) rows of the user's cart."""
+    return get_shopping_carts([user.id]).get(user.id, [])
+
+
+def iter_shopping_cart_lines(user):
+    """Yield the shopping cart as text lines, title and header first."""
+    yield SHOPPING_CART_TITLE
+    yield ' - '.join(SHOPPING_CART_HEADER)
+    for item in get_shopping_cart(user):
+        yield ' - '.join(str(field) for field in item)
+
+
+def iter_shopping_cart_text(user):
+    for line in iter_shopping_cart_lines(user):
+        yield line + '\n'
+
+
+class EchoBuffer:
+    """File-like object handing written values back to csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def iter_shopping_cart_csv(user):
+    writer = csv.writer(EchoBuffer())
+    yield writer.writerow(SHOPPING_CART_HEADER)
+    for item in get_shopping_cart(user):
+        yield writer.writerow(item)
+
+
+@lru_cache(maxsize=None)
+def get_pdf_font():
+    """Register the configured TTF font, Helvetica if it is missing."""
+    font_path = settings.SHOPPING_CART_PDF_FONT
+    if font_path and Path(font_path).is_file():
+        pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+        return PDF_FONT_NAME
+    return 'Helvetica'
+
+
+def write_shopping_cart_pdf(user, file):
+    """Draw the shopping cart into file as a PDF, page by page."""
+    font = get_pdf_font()
+    pdf = canvas.Canvas(file, pagesize=A4, pageCompression=1)
+    pdf.setTitle(SHOPPING_CART_TITLE)
+    width, height = A4
+    y = height - PDF_MARGIN
+    pdf.setFont(font, PDF_FONT_SIZE)
+    for line in iter_shopping_cart_lines(user):
+        if y < PDF_MARGIN:
+            pdf.showPage()
+            pdf.setFont(font, PDF_FONT_SIZE)
+            y = height - PDF_MARGIN
+        pdf.drawString(PDF_MARGIN, y, line)
+        y -= PDF_LINE_HEIGHT
+    pdf.showPage()
+    pdf.save()
+
+
+def get_relation_ids(request, relation):
+    """Return ids the request user is related to by relation.
+
+    The sets come from the per-user cache and are memoized on the
+    request, so every serializer within the same request shares them.
+    """
+    if not request.user.is_authenticated:
+        return frozenset()
+    relation_ids = request.__dict__.setdefault('_relation_ids', {})
+    if relation not in relation_ids:
+        relation_ids[relation] = get_user_relation_ids(
+            request.user.id, relation)
+    return relation_ids[relation]
+
+
+def get_followed_author_ids(request):
+    """Return ids of authors followed by the request user."""
+    return get_relation_ids(request, 'following')
@@ -0,0 +1,176 @@
+import threading
+
+from django.db import transaction
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from api.caches import (
+    USER_RELATIONS,
+    bump_author_version,
+    bump_catalogue_version,
+    invalidate_shopping_cart_pdfs,
+    invalidate_user_relation_ids,
+)
+from api.images import (
+    downscale_image,
+    needs_variants,
+    schedule_variants,
+)
+from api.indexes import recipe_ingredient_index
+from api.search import get_search_backend
+from recipes.models import (
+    AmountIngredient,
+    Favorite,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipes.signals import relations_bulk_created, relations_bulk_deleted
+from users.models import Subscription, User
+
+RELATION_BY_MODEL = {
+    model: relation for relation, (model, _) in USER_RELATIONS.items()}
+# Ids of recipes changed in the current transaction of this thread
+_changed_recipes = threading.local()
+
+
+def bump_catalogue_version_on_commit(name):
+    # A bump before commit would let readers cache uncommitted rows under
+    # the new version.
+    transaction.on_commit(lambda: bump_catalogue_version(name))
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_version(sender, **kwargs):
+    bump_catalogue_version_on_commit('ingredients')
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(sender, **kwargs):
+    bump_catalogue_version_on_commit('tags')
+
+
+@receiver(post_save, sender=Recipe)
+def render_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance):
+        recipe_id, image_name = instance.pk, instance.image.name
+        transaction.on_commit(
+            lambda: schedule_variants(recipe_id, image_name))
+
+
+@receiver(pre_save, sender=Recipe)
+def downscale_uploaded_image(sender, instance, **kwargs):
+    image = instance.image
+    if image and not image._committed:
+        image.file = downscale_image(image.file)
+
+
+@receiver(pre_save, sender=Recipe)
+def clear_replaced_variants(sender, instance, update_fields, **kwargs):
+    # Files of replaced and deleted images are left to cleanup_images,
+    # which cannot race with a concurrent upload of the same content.
+    if instance.pk is None or (
+            update_fields is not None
+            and 'image_variants' not in update_fields):
+        return
+    image = instance.image
+    name = image.name
+    if image and not image._committed:
+        # The upload still has its temporary name; re-sent content is
+        # stored under the name it already has.
+        name = image.storage.get_content_name(
+            image.field.generate_filename(instance, name), image.file)
+    previous = Recipe.objects.filter(
+        pk=instance.pk).values_list('image', flat=True).first()
+    if previous != name:
+        # New variants are attached once they are rendered.
+        instance.image_variants = {}
+
+
+def flush_changed_recipes():
+    recipe_ids = list(_changed_recipes.ids)
+    _changed_recipes.ids = set()
+    get_search_backend().index(recipe_ids)
+    recipe_ingredient_index.index(recipe_ids)
+    user_ids = set(ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids).values_list('user_id', flat=True))
+    if user_ids:
+        invalidate_shopping_cart_pdfs(list(user_ids))
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=AmountIngredient)
+def collect_changed_recipe(sender, instance, **kwargs):
+    # Rows saved in one transaction are handled together once it commits,
+    # so editing many ingredients of a recipe costs the same as one.
+    recipe_id = instance.pk if sender is Recipe else instance.recipe_id
+    recipe_ids = getattr(_changed_recipes, 'ids', None)
+    # A flush is pending while ids are collected, unless a rollback has
+    # discarded it.
+    pending = recipe_ids and any(
+        callback is flush_changed_recipes
+        for _, callback, _ in transaction.get_connection().run_on_commit)
+    if not pending:
+        _changed_recipes.ids = recipe_ids = set()
+    recipe_ids.add(recipe_id)
+    if not pending:
+        # Runs at once outside a transaction.
+        transaction.on_commit(flush_changed_recipes)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_tagged_recipes(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    # Cached recipe bodies are keyed by Recipe.updated.
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        Recipe.objects.filter(pk=instance.pk).touch()
+    elif pk_set:
+        Recipe.objects.filter(pk__in=pk_set).touch()
+    else:
+        bump_catalogue_version_on_commit('tags')
+
+
+@receiver(post_save, sender=User)
+def bump_author(sender, instance, update_fields, **kwargs):
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    author_id = instance.pk
+    transaction.on_commit(lambda: bump_author_version(author_id))
+
+
+def invalidate_relation_on_commit(sender, user_id):
+    relation = RELATION_BY_MODEL[sender]
+    transaction.on_commit(
+        lambda: invalidate_user_relation_ids(user_id, relation))
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def invalidate_relation_ids(sender, instance, **kwargs):
+    invalidate_relation_on_commit(sender, instance.user_id)
+
+
+@receiver((relations_bulk_created, relations_bulk_deleted))
+def invalidate_bulk_relation_ids(sender, user, **kwargs):
+    invalidate_relation_on_commit(sender, user.id)
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def invalidate_shopping_cart_pdf(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: invalidate_shopping_cart_pdfs([instance.user_id]))
+
+
+@receiver(
+    (relations_bulk_created, relations_bulk_deleted), sender=ShoppingCart)
+def invalidate_bulk_shopping_cart_pdf(sender, user, **kwargs):
+    transaction.on_commit(lambda: invalidate_shopping_cart_pdfs([user.id]))
@@ -0,0 +1,78 @@
+import shutil
+import tempfile
+from base64 import b64encode
+from io import BytesIO
+
+from django.core.cache import cache
+from django.test import override_settings
+from PIL import Image
+from rest_framework.test import APITestCase
+
+from recipes.models import AmountIngredient, Ingredient, Recipe, Tag
+from users.models import User
+
+TEST_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+}
+
+
+def make_image(color='red', size=(40, 30), image_format='PNG'):
+    """Return a base64 data URI of a solid color image."""
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, image_format)
+    return (f'data:image/{image_format.lower()};base64,'
+            f'{b64encode(buffer.getvalue()).decode()}')
+
+
+@override_settings(
+    CACHES=TEST_CACHES, IMAGE_VARIANT_WORKERS=0,
+    RECIPE_SEARCH_BACKEND='python')
+class FoodgramTestCase(APITestCase):
+    """API test case with a private cache and media root."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_settings = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.media_settings.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def create_user(username):
+        return User.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            password='password', first_name=username, last_name=username)
+
+    @staticmethod
+    def create_tag(slug):
+        return Tag.objects.create(
+            name=slug, slug=slug, color=f'#{Tag.objects.count():06x}')
+
+    @staticmethod
+    def create_ingredient(name, measurement_unit='г'):
+        return Ingredient.objects.create(
+            name=name, measurement_unit=measurement_unit)
+
+    @staticmethod
+    def create_recipe(author, name='Recipe', text='Text', amounts=None,
+                      tags=()):
+        recipe = Recipe.objects.create(
+            author=author, name=name, text=text, cooking_time=10,
+            image='recipes/images/recipe.jpg')
+        recipe.tags.set(tags)
+        AmountIngredient.objects.bulk_create(
+            AmountIngredient(recipe=recipe, ingredient=ingredient,
+                             amount=amount)
+            for ingredient, amount in (amounts or {}).items())
+        return recipe
@@ -0,0 +1,58 @@
+from api.caches import get_catalogue_version
+from api.tests.base import FoodgramTestCase
+
+
+class CatalogueTests(FoodgramTestCase):
+
+    def test_ingredient_save_bumps_version_after_commit(self):
+        version = get_catalogue_version('ingredients')
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.create_ingredient('Соль')
+            self.assertEqual(get_catalogue_version('ingredients'), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_catalogue_version('ingredients'), version)
+
+    def test_list_serves_new_tags_after_commit(self):
+        self.create_tag('breakfast')
+        self.assertEqual(len(self.client.get('/api/tags/').json()), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_tag('lunch')
+        self.assertEqual(len(self.client.get('/api/tags/').json()), 2)
+
+
+class IngredientSearchTests(FoodgramTestCase):
+    url = '/api/ingredients/'
+
+    def setUp(self):
+        super().setUp()
+        for name in ('Тростниковый сахар', 'Сахар', 'Сахарная пудра',
+                     'Ванильный сахар', 'Ёрш', 'Свёкла', 'Соль'):
+            self.create_ingredient(name)
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix_matches_come_before_substring_matches(self):
+        self.assertEqual(self.search(name='сах'), [
+            'Сахар', 'Сахарная пудра', 'Ванильный сахар',
+            'Тростниковый сахар'])
+
+    def test_yo_is_folded(self):
+        self.assertEqual(self.search(name='ерш'), ['Ёрш'])
+        self.assertEqual(self.search(name='ЁРШ'), ['Ёрш'])
+        self.assertEqual(self.search(name='свекл'), ['Свёкла'])
+
+    def test_limit(self):
+        self.assertEqual(self.search(name='сах', limit=1), ['Сахар'])
+        self.assertEqual(
+            self.search(name='сах', limit=3),
+            ['Сахар', 'Сахарная пудра', 'Ванильный сахар'])
+
+    def test_new_ingredients_are_found_after_commit(self):
+        self.assertEqual(self.search(name='перец'), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_ingredient('Перец')
+        self.assertEqual(self.search(name='перец'), ['Перец'])
@@ -0,0 +1,20 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.tests.base import FoodgramTestCase
+
+
+class BenchRecipeReadTests(FoodgramTestCase):
+
+    @override_settings(ALLOWED_HOSTS=['127.0.0.1', 'localhost'])
+    def test_runs_with_default_allowed_hosts(self):
+        author = self.create_user('author')
+        self.create_recipe(
+            author, amounts={self.create_ingredient('Соль'): 5},
+            tags=[self.create_tag('lunch')])
+        output = StringIO()
+        call_command(
+            'bench_recipe_read', page_sizes=[6], repeat=1, stdout=output)
+        self.assertIn('x\n', output.getvalue())
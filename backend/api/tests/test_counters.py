@@ -0,0 +1,63 @@
+from django.apps import apps
+from django.db import migrations, models
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Favorite, Recipe
+from recipes.signals import backfill_counters
+from users.models import Subscription
+
+
+class CounterTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('reader')
+        self.author = self.create_user('author')
+        self.recipe = self.create_recipe(self.author)
+        self.client.force_authenticate(self.user)
+
+    def test_toggles_keep_counters(self):
+        self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.client.post(f'/api/users/{self.author.id}/subscribe/')
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.author.subscribers_count, 1)
+        self.assertEqual(self.author.recipes_count, 1)
+        self.client.delete(f'/api/recipes/{self.recipe.id}/favorite/')
+        self.client.delete(f'/api/users/{self.author.id}/subscribe/')
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertEqual(self.author.subscribers_count, 0)
+
+    def test_decrement_of_stale_counter_stops_at_zero(self):
+        # Rows created before the counter columns existed start at 0.
+        Favorite.objects.bulk_create(
+            [Favorite(user=self.user, recipe=self.recipe)])
+        Subscription.objects.bulk_create(
+            [Subscription(user=self.user, author=self.author)])
+        response = self.client.delete(
+            f'/api/recipes/{self.recipe.id}/favorite/')
+        self.assertEqual(response.status_code, 204)
+        response = self.client.delete(
+            f'/api/users/{self.author.id}/subscribe/')
+        self.assertEqual(response.status_code, 204)
+        self.recipe.refresh_from_db()
+        self.author.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertEqual(self.author.subscribers_count, 0)
+
+    def test_migration_adding_counter_backfills_it(self):
+        Favorite.objects.bulk_create(
+            [Favorite(user=self.user, recipe=self.recipe)])
+        Recipe.objects.update(favorites_count=0)
+        migration = migrations.Migration('0002_counters', 'recipes')
+        migration.operations = [migrations.AddField(
+            model_name='recipe', name='favorites_count',
+            field=models.PositiveIntegerField(default=0))]
+        backfill_counters(
+            sender=apps.get_app_config('recipes'),
+            plan=[(migration, False)])
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
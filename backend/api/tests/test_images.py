@@ -0,0 +1,156 @@
+from base64 import b64decode, b64encode
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+from PIL import Image
+
+from api.images import get_variant_names, needs_variants
+from api.serializers import RecipeCreateSerializer
+from api.tests.base import FoodgramTestCase, make_image
+from recipes.models import Recipe
+from recipes.storage import image_storage
+
+
+class RecipeImageTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('author')
+        self.client.force_authenticate(self.user)
+        self.tag = self.create_tag('lunch')
+        self.salt = self.create_ingredient('Соль')
+
+    def post_recipe(self, image, method='post', url='/api/recipes/'):
+        return getattr(self.client, method)(url, {
+            'name': 'Борщ', 'text': 'Сварить', 'cooking_time': 60,
+            'image': image, 'tags': [self.tag.id],
+            'ingredients': [{'id': self.salt.id, 'amount': 5}],
+        }, format='json')
+
+    def create_recipe_with_image(self, image):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_recipe(image)
+        self.assertEqual(response.status_code, 201, response.data)
+        return Recipe.objects.get(pk=response.data['id'])
+
+    def test_variants_are_rendered_after_commit(self):
+        recipe = self.create_recipe_with_image(make_image())
+        self.assertEqual(
+            set(recipe.image_variants), {'thumbnail', 'card'})
+        for names in recipe.image_variants.values():
+            for name in names.values():
+                self.assertTrue(default_storage.exists(name))
+
+    def test_changed_variant_size_gets_new_names(self):
+        recipe = self.create_recipe_with_image(make_image())
+        with mock.patch.dict(
+                'api.images.IMAGE_VARIANT_SIZES', {'thumbnail': (100, 100)}):
+            self.assertTrue(needs_variants(recipe))
+            new_names = get_variant_names(recipe.image.name)
+        self.assertNotEqual(
+            new_names['thumbnail'], recipe.image_variants['thumbnail'])
+
+    def test_image_change_clears_variants_with_the_same_save(self):
+        recipe = self.create_recipe_with_image(make_image('red'))
+        old_variants = recipe.image_variants
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.post_recipe(
+                make_image('blue'), 'patch', f'/api/recipes/{recipe.id}/')
+            self.assertEqual(response.status_code, 200, response.data)
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.image_variants, {})
+            self.assertEqual(response.data['image_variants'], {})
+        for callback in callbacks:
+            callback()
+        recipe.refresh_from_db()
+        self.assertNotEqual(recipe.image_variants, old_variants)
+
+    def test_resent_image_keeps_variants(self):
+        image = make_image('red')
+        recipe = self.create_recipe_with_image(image)
+        variants = recipe.image_variants
+        with mock.patch('api.signals.schedule_variants') as schedule, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.post_recipe(
+                image, 'patch', f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            set(response.data['image_variants']), {'thumbnail', 'card'})
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants, variants)
+        schedule.assert_not_called()
+
+    def test_cleanup_deletes_replaced_image_and_variants(self):
+        recipe = self.create_recipe_with_image(make_image('red'))
+        old_names = [recipe.image.name, *(
+            name for names in recipe.image_variants.values()
+            for name in names.values())]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_recipe(
+                make_image('blue'), 'patch', f'/api/recipes/{recipe.id}/')
+        recipe.refresh_from_db()
+        new_names = [recipe.image.name, *(
+            name for names in recipe.image_variants.values()
+            for name in names.values())]
+        call_command('cleanup_images', min_age=3600, stdout=StringIO())
+        for name in old_names + new_names:
+            self.assertTrue(default_storage.exists(name))
+        call_command('cleanup_images', min_age=0, stdout=StringIO())
+        for name in old_names:
+            self.assertFalse(default_storage.exists(name))
+        for name in new_names:
+            self.assertTrue(default_storage.exists(name))
+
+    def test_same_content_is_stored_once(self):
+        image = make_image('green')
+        first = self.create_recipe_with_image(image)
+        second = self.create_recipe_with_image(image)
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_truncated_image_is_rejected(self):
+        image = make_image(size=(200, 200), image_format='PNG')
+        prefix, payload = image.split(',')
+        data = b64decode(payload)[:-40]
+        response = self.post_recipe(f'{prefix},{b64encode(data).decode()}')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=1000)
+    def test_oversized_payload_is_rejected(self):
+        response = self.post_recipe(make_image(size=(400, 400)))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('image', response.data)
+
+    @override_settings(IMAGE_MAX_DIMENSION=50)
+    def test_large_image_is_downscaled_when_saved(self):
+        field = RecipeCreateSerializer().fields['image']
+        validated = field.to_internal_value(make_image(size=(200, 100)))
+        with Image.open(validated) as image:
+            self.assertEqual(image.size, (200, 100))
+        validated.close()
+        recipe = self.create_recipe_with_image(make_image(size=(200, 100)))
+        with Image.open(recipe.image.path) as image:
+            self.assertEqual(image.size, (50, 25))
+
+
+class ContentAddressedStorageTests(FoodgramTestCase):
+
+    def test_delete_if_older_keeps_reused_file(self):
+        name = image_storage.save(
+            'recipes/images/a.jpg', ContentFile(b'content'))
+        cutoff = timezone.now() - timedelta(minutes=1)
+        self.assertFalse(image_storage.delete_if_older(name, cutoff))
+        self.assertTrue(image_storage.exists(name))
+        cutoff = timezone.now() + timedelta(minutes=1)
+        self.assertTrue(image_storage.delete_if_older(name, cutoff))
+        self.assertFalse(image_storage.exists(name))
+        # Saving the same content again writes a fresh copy.
+        self.assertEqual(image_storage.save(
+            'recipes/images/b.jpg', ContentFile(b'content')), name)
+        self.assertTrue(image_storage.exists(name))
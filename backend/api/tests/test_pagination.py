@@ -0,0 +1,62 @@
+from django.utils import timezone
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Recipe
+
+
+class RecipeCursorPaginationTests(FoodgramTestCase):
+    url = '/api/recipes/'
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.other = self.create_user('other')
+        self.lunch = self.create_tag('lunch')
+        self.recipes = [
+            self.create_recipe(
+                self.author if number % 2 else self.other,
+                f'Recipe {number}',
+                tags=[self.lunch] if number % 3 else [])
+            for number in range(7)]
+        # Several recipes share a pub_date, leaving the tie to the id.
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in self.recipes[1:5]]
+        ).update(pub_date=timezone.now())
+
+    def walk(self, **params):
+        """Return recipe ids of every page, following next links."""
+        recipe_ids = []
+        response = self.client.get(self.url, {'cursor': '', **params})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            recipe_ids.extend(
+                recipe['id'] for recipe in response.data['results'])
+            if response.data['next'] is None:
+                return recipe_ids
+            response = self.client.get(response.data['next'])
+
+    def expected_ids(self, recipes):
+        return list(
+            recipes.order_by('-pub_date', '-id').values_list('id', flat=True))
+
+    def test_walks_every_recipe_once(self):
+        self.assertEqual(
+            self.walk(limit=2), self.expected_ids(Recipe.objects.all()))
+
+    def test_combines_with_filters(self):
+        self.assertEqual(
+            self.walk(limit=1, author=self.author.id, tags='lunch'),
+            self.expected_ids(Recipe.objects.filter(
+                author=self.author, tags=self.lunch)))
+
+    def test_last_page_has_no_next(self):
+        response = self.client.get(self.url, {'cursor': '', 'limit': 7})
+        self.assertEqual(len(response.data['results']), 7)
+        self.assertIsNone(response.data['next'])
+
+    def test_malformed_cursor_is_not_found(self):
+        for cursor in ('not base64!', 'bm8tc2VwYXJhdG9y', 'eHx5'):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(self.url, {'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,65 @@
+from django.contrib.auth.models import AnonymousUser
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.fast_read import CachedRecipeReadPlan
+from api.tests.base import FoodgramTestCase
+from recipes.models import Recipe
+
+
+@override_settings(RECIPE_CACHE=True)
+class RecipeCacheTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.tag = self.create_tag('lunch')
+        self.recipe = self.create_recipe(
+            self.author, name='Борщ',
+            amounts={self.create_ingredient('Свёкла'): 300},
+            tags=[self.tag])
+
+    def get_recipe(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_matches_serializer_output(self):
+        cached = self.client.get('/api/recipes/').content
+        self.assertEqual(self.client.get('/api/recipes/').content, cached)
+        with override_settings(RECIPE_CACHE=False):
+            self.assertEqual(self.client.get('/api/recipes/').content, cached)
+
+    def test_recipe_edit_is_served(self):
+        self.get_recipe()
+        self.recipe.name = 'Щи'
+        self.recipe.save()
+        self.assertEqual(self.get_recipe()['name'], 'Щи')
+
+    def test_stale_render_is_not_served(self):
+        stale = Recipe.objects.get(pk=self.recipe.id)
+        self.recipe.name = 'Щи'
+        self.recipe.save()
+        # A reader that loaded the row before the write renders it after.
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        CachedRecipeReadPlan(request).render([stale])
+        self.assertEqual(self.get_recipe()['name'], 'Щи')
+
+    def test_tag_changes_are_served(self):
+        self.get_recipe()
+        self.recipe.tags.clear()
+        self.assertEqual(self.get_recipe()['tags'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tag.recipes.add(self.recipe)
+            self.tag.name = 'Обед'
+            self.tag.save()
+        self.assertEqual(self.get_recipe()['tags'][0]['name'], 'Обед')
+
+    def test_author_changes_are_served(self):
+        self.get_recipe()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.username = 'chef'
+            self.author.save()
+        self.assertEqual(self.get_recipe()['author']['username'], 'chef')
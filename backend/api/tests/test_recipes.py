@@ -0,0 +1,105 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import PrimaryKeyRelatedField
+
+from api.serializers import DOES_NOT_EXIST_MESSAGE
+from api.tests.base import FoodgramTestCase, make_image
+from recipes.models import AmountIngredient
+
+
+class RecipeUpdateTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.client.force_authenticate(self.author)
+        self.tag = self.create_tag('lunch')
+        self.salt, self.sugar, self.eggs, self.milk = (
+            self.create_ingredient(name)
+            for name in ('Соль', 'Сахар', 'Яйца', 'Молоко'))
+        self.recipe = self.create_recipe(
+            self.author, amounts={self.salt: 5, self.sugar: 10, self.eggs: 2},
+            tags=[self.tag])
+
+    def patch(self, amounts, **data):
+        response = self.client.patch(f'/api/recipes/{self.recipe.id}/', {
+            'tags': [self.tag.id],
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient, amount in amounts.items()],
+            **data,
+        }, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response
+
+    def get_rows(self):
+        return {
+            row.ingredient_id: (row.id, row.amount)
+            for row in AmountIngredient.objects.filter(recipe=self.recipe)}
+
+    def test_text_edit_writes_no_ingredients(self):
+        amounts = {self.salt: 5, self.sugar: 10, self.eggs: 2}
+        # Lookups and validation, the tag and amount diffs with the cart
+        # totals check, the recipe update and the response with the
+        # viewer's relation flags.
+        with self.assertNumQueries(18), \
+                CaptureQueriesContext(connection) as queries:
+            self.patch(amounts, text='Новый текст')
+        self.assertFalse([
+            query['sql'] for query in queries
+            if 'recipes_amountingredient' in query['sql']
+            and not query['sql'].startswith('SELECT')])
+
+    def test_mixed_edit_writes_only_changed_rows(self):
+        before = self.get_rows()
+        self.patch({self.salt: 5, self.sugar: 20, self.milk: 100})
+        after = self.get_rows()
+        self.assertEqual(after[self.salt.id], before[self.salt.id])
+        self.assertEqual(after[self.sugar.id], (before[self.sugar.id][0], 20))
+        self.assertNotIn(self.eggs.id, after)
+        self.assertEqual(after[self.milk.id][1], 100)
+
+
+class RecipeValidationTests(FoodgramTestCase):
+    url = '/api/recipes/'
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.create_user('author'))
+        self.tags = [self.create_tag(slug) for slug in ('a', 'b', 'c')]
+        self.ingredients = [
+            self.create_ingredient(name) for name in ('Соль', 'Сахар')]
+
+    def post(self, tag_ids, ingredient_ids):
+        return self.client.post(self.url, {
+            'name': 'Борщ', 'text': 'Сварить', 'cooking_time': 60,
+            'image': make_image(), 'tags': tag_ids,
+            'ingredients': [
+                {'id': ingredient_id, 'amount': 1}
+                for ingredient_id in ingredient_ids],
+        }, format='json')
+
+    def test_missing_ids_are_reported_per_field(self):
+        missing = 1000
+        salt, sugar = (ingredient.id for ingredient in self.ingredients)
+        # One query for the tags and one for the ingredients.
+        with self.assertNumQueries(2):
+            response = self.post(
+                [tag.id for tag in self.tags] + [missing],
+                [salt, missing, sugar])
+        self.assertEqual(response.status_code, 400)
+        message = DOES_NOT_EXIST_MESSAGE.format(pk_value=missing)
+        self.assertEqual(response.data['tags'], [message])
+        self.assertEqual(
+            response.data['ingredients'], [{}, {'id': [message]}, {}])
+
+    def test_ids_of_wrong_type(self):
+        response = self.post(['a'], [True])
+        self.assertEqual(response.status_code, 400)
+        message = (
+            PrimaryKeyRelatedField.default_error_messages['incorrect_type'])
+        self.assertEqual(
+            response.data['tags'], {0: [message.format(data_type='str')]})
+        self.assertEqual(
+            response.data['ingredients'],
+            [{'id': [message.format(data_type='bool')]}])
@@ -0,0 +1,215 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.caches import get_user_relation_ids
+from api.tests.base import FoodgramTestCase
+from recipes.models import Favorite, ShoppingCart, ShoppingCartIngredient
+from recipes.signals import relations_bulk_created
+from users.models import Subscription
+
+
+class ShoppingCartTotalsTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('reader')
+        self.client.force_authenticate(self.user)
+        self.salt = self.create_ingredient('Соль')
+        self.recipe = self.create_recipe(
+            self.create_user('author'), amounts={self.salt: 5})
+
+    def test_racing_totals_insert_is_retried(self):
+        # Another cart add inserts the total after this one looked for it.
+        ShoppingCartIngredient.objects.create(
+            user=self.user, ingredient=self.salt, amount=2)
+        objects = ShoppingCartIngredient.objects
+        with mock.patch.object(objects, 'select_for_update', side_effect=[
+                objects.none(), objects.select_for_update()]):
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(objects.get(user=self.user).amount, 7)
+
+    def test_racing_bulk_add_counts_skipped_rows_once(self):
+        self.client.post(f'/api/recipes/{self.recipe.id}/shopping_cart/')
+        # A bulk add that saw no cart row, then had its insert of the same
+        # row skipped as a conflict.
+        relations_bulk_created.send(
+            sender=ShoppingCart, user=self.user, target_ids=[self.recipe.id])
+        self.assertEqual(
+            ShoppingCartIngredient.objects.get(user=self.user).amount, 5)
+
+
+class RelationToggleTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('reader')
+        self.author = self.create_user('author')
+        self.client.force_authenticate(self.user)
+        self.recipe = self.create_recipe(self.author)
+
+    def assert_toggles(self, url, model, **lookup):
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(model.objects.filter(**lookup).exists())
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('already', str(response.data))
+        self.assertEqual(model.objects.filter(**lookup).count(), 1)
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(model.objects.filter(**lookup).exists())
+        self.assertEqual(self.client.delete(url).status_code, 400)
+
+    def test_favorite(self):
+        self.assert_toggles(
+            f'/api/recipes/{self.recipe.id}/favorite/', Favorite,
+            user=self.user, recipe=self.recipe)
+
+    def test_shopping_cart(self):
+        self.assert_toggles(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/', ShoppingCart,
+            user=self.user, recipe=self.recipe)
+
+    def test_subscribe(self):
+        self.assert_toggles(
+            f'/api/users/{self.author.id}/subscribe/', Subscription,
+            user=self.user, author=self.author)
+
+    def test_subscribe_to_yourself(self):
+        response = self.client.post(f'/api/users/{self.user.id}/subscribe/')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscription.objects.exists())
+
+    def test_missing_recipe(self):
+        for action in ('favorite', 'shopping_cart'):
+            with self.subTest(action=action):
+                response = self.client.post(f'/api/recipes/0/{action}/')
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('recipe', response.data)
+
+    def test_favorite_queries(self):
+        url = f'/api/recipes/{self.recipe.id}/favorite/'
+        # Recipe lookup, insert and counter update in a savepoint.
+        with self.assertNumQueries(5):
+            self.assertEqual(self.client.post(url).status_code, 201)
+
+
+class BulkRelationTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('reader')
+        self.client.force_authenticate(self.user)
+        author = self.create_user('author')
+        self.recipes = [
+            self.create_recipe(author, f'Recipe {number}')
+            for number in range(3)]
+
+    def bulk(self, method, action, recipe_ids):
+        response = getattr(self.client, method)(
+            f'/api/recipes/{action}/', {'recipes': recipe_ids},
+            format='json')
+        self.assertEqual(response.status_code, 200)
+        return [
+            (result['id'], result['status'])
+            for result in response.data['results']]
+
+    def test_add_and_remove(self):
+        first, second, third = (recipe.id for recipe in self.recipes)
+        missing = third + 1
+        for action, model in (
+                ('favorite', Favorite), ('shopping_cart', ShoppingCart)):
+            with self.subTest(action=action):
+                self.client.post(f'/api/recipes/{first}/{action}/')
+                self.assertEqual(
+                    self.bulk(
+                        'post', action, [first, second, missing, second]),
+                    [(first, 'already_added'), (second, 'added'),
+                     (missing, 'not_found')])
+                self.assertEqual(
+                    set(model.objects.filter(user=self.user).values_list(
+                        'recipe_id', flat=True)),
+                    {first, second})
+                self.assertEqual(
+                    self.bulk('delete', action, [second, third]),
+                    [(second, 'removed'), (third, 'not_found')])
+                self.assertEqual(
+                    list(model.objects.filter(user=self.user).values_list(
+                        'recipe_id', flat=True)),
+                    [first])
+
+    def test_bulk_favorite_updates_counters(self):
+        self.bulk('post', 'favorite', [recipe.id for recipe in self.recipes])
+        for recipe in self.recipes:
+            recipe.refresh_from_db()
+            self.assertEqual(recipe.favorites_count, 1)
+
+    def test_bulk_shopping_cart_updates_totals(self):
+        salt = self.create_ingredient('Соль')
+        recipe = self.create_recipe(
+            self.recipes[0].author, amounts={salt: 5})
+        self.bulk('post', 'shopping_cart', [recipe.id])
+        self.assertEqual(
+            ShoppingCartIngredient.objects.get(user=self.user).amount, 5)
+
+    def test_requires_recipes(self):
+        for method in ('post', 'delete'):
+            with self.subTest(method=method):
+                response = getattr(self.client, method)(
+                    '/api/recipes/favorite/', {'recipes': []},
+                    format='json')
+                self.assertEqual(response.status_code, 400)
+
+    def test_add_queries_do_not_grow_with_recipes(self):
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk('post', 'favorite', recipe_ids[:1])
+        with self.assertNumQueries(len(queries)):
+            self.bulk('post', 'favorite', recipe_ids[1:])
+
+    def test_remove_queries_do_not_grow_with_recipes(self):
+        recipe_ids = [recipe.id for recipe in self.recipes]
+        for action in ('favorite', 'shopping_cart'):
+            with self.subTest(action=action):
+                self.bulk('post', action, recipe_ids)
+                with CaptureQueriesContext(connection) as queries:
+                    self.bulk('delete', action, recipe_ids[:1])
+                with self.assertNumQueries(len(queries)):
+                    self.bulk('delete', action, recipe_ids[1:])
+
+    def test_bulk_remove_updates_counters_and_totals(self):
+        salt = self.create_ingredient('Соль')
+        recipe = self.create_recipe(
+            self.recipes[0].author, amounts={salt: 5})
+        recipe_ids = [recipe.id, self.recipes[0].id]
+        for action in ('favorite', 'shopping_cart'):
+            self.bulk('post', action, recipe_ids)
+            self.bulk('delete', action, recipe_ids)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.favorites_count, 0)
+        self.assertFalse(
+            ShoppingCartIngredient.objects.filter(user=self.user).exists())
+
+
+class RelationIdsCacheTests(FoodgramTestCase):
+
+    def test_set_read_before_a_write_is_not_served_after_it(self):
+        user = self.create_user('reader')
+        recipe = self.create_recipe(self.create_user('author'))
+        set_ids = cache.set
+
+        def write_then_set(*args, **kwargs):
+            # The rows were read; a favorite commits before they are cached.
+            with self.captureOnCommitCallbacks(execute=True):
+                Favorite.objects.create(user=user, recipe=recipe)
+            set_ids(*args, **kwargs)
+
+        with mock.patch.object(cache, 'set', side_effect=write_then_set):
+            self.assertEqual(
+                get_user_relation_ids(user.id, 'favorites'), frozenset())
+        self.assertEqual(
+            get_user_relation_ids(user.id, 'favorites'), {recipe.id})
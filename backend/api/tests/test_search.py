@@ -0,0 +1,137 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITransactionTestCase
+
+from api.search import SEARCH_BACKENDS, search_recipes
+from api.signals import flush_changed_recipes
+from api.tests.base import TEST_CACHES, FoodgramTestCase
+from recipes.models import Recipe
+from users.models import User
+
+
+class SearchTests(FoodgramTestCase):
+    url = '/api/recipes/'
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.other = self.create_user('other')
+        beet = self.create_ingredient('Свёкла')
+        self.borscht = self.create_recipe(
+            self.author, 'Борщ', 'Свёклу натереть', {beet: 200})
+        self.salad = self.create_recipe(
+            self.other, 'Салат из свёклы', 'Свёклы много', {beet: 100})
+        self.create_recipe(self.author, 'Омлет', 'Яйца взбить')
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_matches_word_forms_best_first(self):
+        self.assertEqual(
+            self.search(search='свекла'), [self.salad.id, self.borscht.id])
+
+    def test_every_term_must_match(self):
+        self.assertEqual(self.search(search='борщ свекла'), [self.borscht.id])
+        self.assertEqual(self.search(search='борщ яйца'), [])
+
+    def test_combines_with_other_filters(self):
+        self.assertEqual(
+            self.search(search='свекла', author=self.author.id),
+            [self.borscht.id])
+
+    def test_cursor_keeps_ranking(self):
+        newest = self.create_recipe(self.other, 'Суп', 'Немного свёклы')
+        self.assertEqual(
+            self.search(search='свекла', cursor=''),
+            [self.salad.id, self.borscht.id, newest.id])
+
+    def test_limit_counts_filtered_recipes(self):
+        for number in range(5):
+            self.create_recipe(self.other, f'Свекла {number}')
+        recipe_ids = search_recipes(
+            'свекла', Recipe.objects.filter(author=self.author), limit=1)
+        self.assertEqual(recipe_ids, [self.borscht.id])
+
+    @override_settings(RECIPE_SEARCH_BACKEND='fts5')
+    def test_fts5_falls_back_until_built(self):
+        self.assertEqual(
+            self.search(search='свекла'), [self.salad.id, self.borscht.id])
+        self.assertNotIn(
+            SEARCH_BACKENDS['fts5'].table,
+            connection.introspection.table_names())
+
+
+@override_settings(CACHES=TEST_CACHES, RECIPE_SEARCH_BACKEND='fts5')
+class FTS5SearchTests(APITransactionTestCase):
+    """Runs outside a test transaction, which FTS5 tables do not survive."""
+
+    def setUp(self):
+        self.backend = SEARCH_BACKENDS['fts5']
+        self.addCleanup(self.drop_table)
+        author = User.objects.create_user(
+            email='author@example.com', username='author',
+            password='password', first_name='author', last_name='author')
+        # Without images, so saves do not render image variants.
+        self.recipes = Recipe.objects.bulk_create(
+            Recipe(author=author, name=name, text='Text', cooking_time=10)
+            for name in ('Салат из свёклы', 'Свёкла', 'Омлет'))
+
+    def drop_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.backend.table}')
+        self.backend._ready = False
+
+    def test_rebuild_builds_table_and_saves_are_indexed(self):
+        self.assertEqual(self.backend.rebuild(), 3)
+        recipe_ids = search_recipes('свекла', Recipe.objects.all())
+        self.assertEqual(recipe_ids, [self.recipes[1].id, self.recipes[0].id])
+        omelette = self.recipes[2]
+        omelette.name = 'Омлет со свёклой'
+        omelette.save()
+        self.assertIn(
+            omelette.id, search_recipes('свекла', Recipe.objects.all()))
+
+
+class RecipeChangeTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.author = self.create_user('author')
+        self.client.force_authenticate(self.author)
+        self.tag = self.create_tag('dinner')
+        self.ingredients = [
+            self.create_ingredient(f'Ингредиент {number}')
+            for number in range(10)]
+
+    def update_keeping(self, count):
+        recipe = self.create_recipe(
+            self.author, amounts=dict.fromkeys(self.ingredients, 1),
+            tags=[self.tag])
+        # Stands in for the commit of the recipe creation.
+        flush_changed_recipes()
+        cache.clear()
+        return lambda: self.client.patch(
+            f'/api/recipes/{recipe.id}/', {
+                'tags': [self.tag.id],
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 1}
+                    for ingredient in self.ingredients[:count]],
+            }, format='json')
+
+    def test_dropped_ingredients_do_not_add_queries(self):
+        update = self.update_keeping(9)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(update().status_code, 200)
+        update = self.update_keeping(1)
+        with self.assertNumQueries(len(queries)):
+            self.assertEqual(update().status_code, 200)
+
+    def test_changes_are_flushed_once_per_transaction(self):
+        update = self.update_keeping(1)
+        with self.captureOnCommitCallbacks() as callbacks:
+            update()
+        self.assertEqual(callbacks.count(flush_changed_recipes), 1)
@@ -0,0 +1,75 @@
+from django.test import override_settings
+
+from api.tests.base import FoodgramTestCase
+
+
+class DownloadShoppingCartTests(FoodgramTestCase):
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('reader')
+        self.client.force_authenticate(self.user)
+        sugar = self.create_ingredient('Сахар', 'г')
+        sugar_kg = self.create_ingredient('сахар', 'кг')
+        eggs = self.create_ingredient('Яйца', 'шт')
+        author = self.create_user('author')
+        for amounts in ({sugar: 500, eggs: 2}, {sugar_kg: 1, eggs: 3}):
+            recipe = self.create_recipe(author, amounts=amounts)
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    def download(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        content = getattr(response, 'streaming_content', None)
+        if content is None:
+            return response, response.content
+        return response, b''.join(content)
+
+    def test_text_merges_convertible_units(self):
+        response, content = self.download()
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('shopping_cart.txt', response['Content-Disposition'])
+        lines = content.decode().splitlines()
+        self.assertIn('Сахар - кг - 1.5', lines)
+        self.assertIn('Яйца - шт - 5', lines)
+
+    def test_csv(self):
+        response, content = self.download(format='csv')
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+        self.assertIn('Сахар,кг,1.5', content.decode().splitlines())
+
+    def test_pdf(self):
+        response, content = self.download(format='pdf')
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+
+    def test_fast_read_keeps_download_renderers(self):
+        for flag in ('RECIPE_FAST_READ', 'RECIPE_CACHE'):
+            with self.subTest(flag=flag), override_settings(**{flag: True}):
+                response, content = self.download()
+                self.assertTrue(
+                    response['Content-Type'].startswith('text/plain'))
+                self.assertIn(
+                    'shopping_cart.txt', response['Content-Disposition'])
+                self.assertIn('Яйца - шт - 5', content.decode())
+
+    def test_other_accept_header_gets_text(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertIn('Яйца - шт - 5', b''.join(
+            response.streaming_content).decode())
+
+    def test_accept_header_selects_format(self):
+        response = self.client.get(self.url, HTTP_ACCEPT='text/csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/csv'))
+
+    def test_unknown_format_is_refused(self):
+        self.assertEqual(
+            self.client.get(self.url, {'format': 'xls'}).status_code, 404)
+
+    def test_requires_authentication(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
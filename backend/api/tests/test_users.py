@@ -0,0 +1,49 @@
+from django.core.cache import cache
+
+from api.tests.base import FoodgramTestCase
+from users.models import Subscription
+
+
+class SubscriptionsTests(FoodgramTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.user = self.create_user('reader')
+        self.client.force_authenticate(self.user)
+
+    def subscribe_to_authors(self, count, recipes_per_author=3):
+        authors = [
+            self.create_user(f'author{index}')
+            for index in range(Subscription.objects.count(),
+                               Subscription.objects.count() + count)]
+        for author in authors:
+            for index in range(recipes_per_author):
+                self.create_recipe(author, name=f'{author.username} {index}')
+            Subscription.objects.create(user=self.user, author=author)
+        return authors
+
+    def test_recipes_limit_keeps_newest_recipes(self):
+        author, = self.subscribe_to_authors(1)
+        newest = list(author.recipes.order_by('-pub_date', '-id')
+                      .values_list('id', flat=True)[:2])
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 2})
+        self.assertEqual(response.status_code, 200)
+        result, = response.data['results']
+        self.assertEqual(
+            [recipe['id'] for recipe in result['recipes']], newest)
+        self.assertEqual(result['recipes_count'], 3)
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.subscribe_to_authors(1)
+        with self.assertNumQueries(4):
+            self.client.get(
+                '/api/users/subscriptions/', {'recipes_limit': 2})
+        self.subscribe_to_authors(5, recipes_per_author=4)
+        cache.clear()
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                '/api/users/subscriptions/', {'recipes_limit': 2})
+        self.assertEqual(len(response.data['results']), 6)
+        for result in response.data['results']:
+            self.assertLessEqual(len(result['recipes']), 2)
@@ -1,125 +1,341 @@
-from django.http import HttpResponse
+from tempfile import TemporaryFile
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
+from django.http import (
+    FileResponse,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
+from django.utils.cache import patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as BaseUserViewSet
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import (
     SAFE_METHODS,
     IsAuthenticated,
     IsAuthenticatedOrReadOnly,
 )
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.serializers import as_serializer_error
+from rest_framework.settings import api_settings
 
+from api.caches import (
+    get_catalogue,
+    get_shopping_cart_pdf,
+    set_shopping_cart_pdf,
+)
+from api.fast_read import CachedRecipeReadPlan, RecipeReadPlan
 from api.filters import IngredientFilter, RecipeFilter
-from api.paginations import CustomPagination
+from api.indexes import ingredient_index, recipe_ingredient_index
+from api.paginations import CustomPagination, RecipePagination
 from api.permissions import AuthorOrReadOnly
+from api.renderers import (
+    CSVRenderer,
+    DownloadContentNegotiation,
+    FastJSONRenderer,
+    PDFRenderer,
+    PlainTextRenderer,
+)
+from api.search import SEARCH_MAX_FILTER_CHUNK_SIZE, filter_ranked_ids
 from api.serializers import (
+    DOES_NOT_EXIST_MESSAGE,
     FavoriteCreateDeleteSerializer,
     IngredientSerializer,
+    PantrySerializer,
     RecipeCreateSerializer,
+    RecipeIdsSerializer,
     RecipeReadSerializer,
     ShoppingCartCreateDeleteSerializer,
     SubscribeCreateSerializer,
     SubscribeSerializer,
     TagSerializer,
 )
-from api.services import generate_shopping_cart_text
+from api.services import (
+    iter_shopping_cart_csv,
+    iter_shopping_cart_text,
+    write_shopping_cart_pdf,
+)
 from recipes.models import (
     Ingredient,
     Recipe,
     Tag,
 )
+from recipes.signals import relations_bulk_created, relations_bulk_deleted
 from users.models import User
 
 
 class BaseRelationsViewSet:
-    def relation_create(self, request, serializer_class, data):
-        serializer = serializer_class(data=data, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+    """Create and delete user relations relying on unique constraints."""
 
-    def relation_delete(self, request, serializer_class,
-                        user_id, target_id, target_type):
-        serializer = serializer_class()
-        if target_type == 'author':
-            serializer.validate_for_delete(
-                user_id=user_id, author_id=target_id)
-            serializer.Meta.model.objects.filter(
-                user_id=user_id, author_id=target_id).delete()
-        elif target_type == 'recipe':
-            serializer.validate_for_delete(
-                user_id=user_id, recipe_id=target_id)
-            serializer.Meta.model.objects.filter(
-                user_id=user_id, recipe_id=target_id).delete()
+    def relation_create(self, request, serializer_class, target_id):
+        model = serializer_class.Meta.model
+        target_field = serializer_class.target_field
+        target_model = model._meta.get_field(target_field).related_model
+        try:
+            target = target_model.objects.get(pk=target_id)
+        except (target_model.DoesNotExist, ValueError):
+            raise ValidationError(
+                {target_field: [
+                    DOES_NOT_EXIST_MESSAGE.format(pk_value=target_id)]},
+                code='does_not_exist')
+        data = {'user': request.user, target_field: target}
+        serializer = serializer_class(context={'request': request})
+        try:
+            serializer.validate(data)
+        except ValidationError as error:
+            raise ValidationError(as_serializer_error(error))
+        try:
+            with transaction.atomic():
+                instance = model.objects.create(**data)
+        except IntegrityError:
+            if not model.objects.filter(**data).exists():
+                raise
+            raise ValidationError(
+                {api_settings.NON_FIELD_ERRORS_KEY: [
+                    serializer_class.already_exists_message]},
+                code=status.HTTP_400_BAD_REQUEST)
+        serializer.instance = instance
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    def relation_delete(self, request, serializer_class, target_id):
+        deleted, _ = serializer_class.Meta.model.objects.filter(
+            user=request.user,
+            **{serializer_class.target_field: target_id}
+        ).delete()
+        if not deleted:
+            raise ValidationError(
+                detail=serializer_class.does_not_exist_message,
+                code=status.HTTP_400_BAD_REQUEST)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_bulk_target_ids(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
+    def relation_bulk_create(self, request, serializer_class):
+        target_ids = self.get_bulk_target_ids(request)
+        model = serializer_class.Meta.model
+        target_field = serializer_class.target_field
+        target_model = model._meta.get_field(target_field).related_model
+        found_ids = set(target_model.objects.filter(
+            pk__in=target_ids).values_list('pk', flat=True))
+        linked_ids = set(model.objects.filter(
+            user=request.user, **{f'{target_field}__in': target_ids}
+        ).values_list(f'{target_field}_id', flat=True))
+        results = []
+        added_ids = []
+        for target_id in target_ids:
+            if target_id not in found_ids:
+                result = 'not_found'
+            elif target_id in linked_ids:
+                result = 'already_added'
+            else:
+                result = 'added'
+                added_ids.append(target_id)
+            results.append({'id': target_id, 'status': result})
+        if added_ids:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    (model(user=request.user,
+                           **{f'{target_field}_id': target_id})
+                     for target_id in added_ids),
+                    ignore_conflicts=True)
+                relations_bulk_created.send(
+                    sender=model, user=request.user, target_ids=added_ids)
+        return Response({'results': results})
+
+    def relation_bulk_delete(self, request, serializer_class):
+        target_ids = self.get_bulk_target_ids(request)
+        model = serializer_class.Meta.model
+        target_field = serializer_class.target_field
+        linked = dict(model.objects.filter(
+            user=request.user, **{f'{target_field}__in': target_ids}
+        ).values_list(f'{target_field}_id', 'id'))
+        if linked:
+            with transaction.atomic():
+                # Skips the per-row delete signals, whose work the bulk
+                # signal receivers do in set-based statements.
+                model.objects.filter(
+                    id__in=linked.values())._raw_delete(model.objects.db)
+                relations_bulk_deleted.send(
+                    sender=model, user=request.user, target_ids=list(linked))
+        return Response({'results': [
+            {'id': target_id,
+             'status': 'removed' if target_id in linked else 'not_found'}
+            for target_id in target_ids]})
+
 
 class RecipeViewSet(BaseRelationsViewSet, viewsets.ModelViewSet):
-    queryset = Recipe.objects.select_related('author').prefetch_related(
-        'tags', 'ingredients')
     permission_classes = [AuthorOrReadOnly]
-    pagination_class = CustomPagination
+    pagination_class = RecipePagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = RecipeFilter
+    fast_read_actions = ('list', 'retrieve', 'pantry')
+
+    def get_queryset(self):
+        queryset = Recipe.objects.all()
+        if self.request.method in SAFE_METHODS and not settings.RECIPE_CACHE:
+            queryset = queryset.with_read_relations()
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeCreateSerializer
 
+    def get_read_plan(self):
+        """Return the fast read plan, or None to use the serializer."""
+        if settings.RECIPE_CACHE:
+            return CachedRecipeReadPlan(self.request)
+        if settings.RECIPE_FAST_READ:
+            return RecipeReadPlan(self.request)
+        return None
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if (
+            self.action in self.fast_read_actions
+            and (settings.RECIPE_FAST_READ or settings.RECIPE_CACHE)
+        ):
+            renderers.insert(0, FastJSONRenderer())
+        return renderers
+
+    def list(self, request, *args, **kwargs):
+        read_plan = self.get_read_plan()
+        if read_plan is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(read_plan.render(page))
+        return Response(read_plan.render(queryset))
+
+    def retrieve(self, request, *args, **kwargs):
+        read_plan = self.get_read_plan()
+        if read_plan is None:
+            return super().retrieve(request, *args, **kwargs)
+        return Response(read_plan.render([self.get_object()])[0])
+
     @action(methods=['post'], detail=True,
             permission_classes=[permissions.IsAuthenticated])
     def favorite(self, request, pk=None):
-        data = {'user': request.user.id, 'recipe': pk}
         return self.relation_create(
-            request,
-            FavoriteCreateDeleteSerializer,
-            data
-        )
+            request, FavoriteCreateDeleteSerializer, pk)
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk=None):
         return self.relation_delete(
-            request,
-            FavoriteCreateDeleteSerializer,
-            user_id=request.user.id,
-            target_id=pk,
-            target_type='recipe'
-        )
+            request, FavoriteCreateDeleteSerializer, pk)
 
     @action(methods=['post'], detail=True,
             permission_classes=[permissions.IsAuthenticated])
     def shopping_cart(self, request, pk=None):
-        data = {'user': request.user.id, 'recipe': pk}
         return self.relation_create(
-            request,
-            ShoppingCartCreateDeleteSerializer,
-            data
-        )
+            request, ShoppingCartCreateDeleteSerializer, pk)
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk=None):
         return self.relation_delete(
-            request,
-            ShoppingCartCreateDeleteSerializer,
-            user_id=request.user.id,
-            target_id=pk,
-            target_type='recipe'
-        )
+            request, ShoppingCartCreateDeleteSerializer, pk)
 
-    @action(methods=['get'], detail=False,
+    @action(methods=['post'], detail=False, url_path='favorite',
+            permission_classes=[permissions.IsAuthenticated])
+    def bulk_favorite(self, request):
+        return self.relation_bulk_create(
+            request, FavoriteCreateDeleteSerializer)
+
+    @bulk_favorite.mapping.delete
+    def bulk_delete_favorite(self, request):
+        return self.relation_bulk_delete(
+            request, FavoriteCreateDeleteSerializer)
+
+    @action(methods=['post'], detail=False, url_path='shopping_cart',
             permission_classes=[permissions.IsAuthenticated])
+    def bulk_shopping_cart(self, request):
+        return self.relation_bulk_create(
+            request, ShoppingCartCreateDeleteSerializer)
+
+    @bulk_shopping_cart.mapping.delete
+    def bulk_delete_shopping_cart(self, request):
+        return self.relation_bulk_delete(
+            request, ShoppingCartCreateDeleteSerializer)
+
+    @action(methods=['get'], detail=False)
+    def pantry(self, request):
+        serializer = PantrySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        ranked = recipe_ingredient_index.match(
+            serializer.validated_data['ingredients'],
+            serializer.validated_data['min_coverage'])
+        # Recipes deleted by other processes are still in this one's
+        # index: drop them before the count and pages are taken.
+        coverages = dict(ranked)
+        recipe_ids = list(filter_ranked_ids(
+            coverages, self.get_queryset(), SEARCH_MAX_FILTER_CHUNK_SIZE))
+        if len(recipe_ids) < len(coverages):
+            recipe_ingredient_index.index(
+                coverages.keys() - set(recipe_ids))
+        ranked = [
+            (recipe_id, coverages[recipe_id]) for recipe_id in recipe_ids]
+        paginator = CustomPagination()
+        page = paginator.paginate_queryset(ranked, request, view=self)
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _ in page])
+        page = [
+            (recipes[recipe_id], coverage)
+            for recipe_id, coverage in page if recipe_id in recipes]
+        read_plan = self.get_read_plan()
+        if read_plan is None:
+            data = RecipeReadSerializer(
+                [recipe for recipe, _ in page], many=True,
+                context=self.get_serializer_context()).data
+        else:
+            data = read_plan.render([recipe for recipe, _ in page])
+        for item, (_, coverage) in zip(data, page):
+            item['coverage'] = coverage
+        return paginator.get_paginated_response(data)
+
+    @action(methods=['get'], detail=False,
+            permission_classes=[permissions.IsAuthenticated],
+            renderer_classes=[PlainTextRenderer, CSVRenderer, PDFRenderer],
+            content_negotiation_class=DownloadContentNegotiation)
     def download_shopping_cart(self, request):
-        shopping_cart_text = generate_shopping_cart_text(request)
-        response = HttpResponse(
-            shopping_cart_text,
-            content_type='text/plain')
+        renderer = request.accepted_renderer
+        if renderer.format == 'pdf':
+            response = self.get_shopping_cart_pdf_response(request.user)
+        else:
+            lines = (
+                iter_shopping_cart_csv(request.user)
+                if renderer.format == 'csv'
+                else iter_shopping_cart_text(request.user))
+            response = StreamingHttpResponse(
+                lines,
+                content_type=f'{renderer.media_type}; charset=utf-8')
         response['Content-Disposition'] = (
-            "attachment;filename='shopping_cart.txt'")
+            f"attachment;filename='shopping_cart.{renderer.format}'")
         return response
 
+    @staticmethod
+    def get_shopping_cart_pdf_response(user):
+        content = get_shopping_cart_pdf(user.id)
+        if content is not None:
+            return HttpResponse(content, content_type='application/pdf')
+        pdf_file = TemporaryFile()
+        write_shopping_cart_pdf(user, pdf_file)
+        if pdf_file.tell() <= settings.SHOPPING_CART_PDF_CACHE_MAX_SIZE:
+            pdf_file.seek(0)
+            set_shopping_cart_pdf(user.id, pdf_file.read())
+        pdf_file.seek(0)
+        return FileResponse(pdf_file, content_type='application/pdf')
+
 
 class UserViewSet(BaseRelationsViewSet, BaseUserViewSet):
     queryset = User.objects.all()
@@ -134,39 +350,82 @@ class UserViewSet(BaseRelationsViewSet, BaseUserViewSet):
     @action(methods=['post'], detail=True,
             permission_classes=[permissions.IsAuthenticated])
     def subscribe(self, request, id=None):
-        data = {'user': request.user.id, 'author': id}
-        return self.relation_create(request, SubscribeCreateSerializer, data)
+        return self.relation_create(request, SubscribeCreateSerializer, id)
 
     @subscribe.mapping.delete
     def delete_subscribe(self, request, id=None):
         return self.relation_delete(
-            request,
-            SubscribeCreateSerializer,
-            user_id=request.user.id,
-            target_id=id,
-            target_type='author'
-        )
+            request, SubscribeCreateSerializer, id)
 
     @action(methods=['get'], detail=False,
             permission_classes=[permissions.IsAuthenticated])
     def subscriptions(self, request):
+        recipes = Recipe.objects.all()
+        recipes_limit = request.query_params.get('recipes_limit')
+        if recipes_limit and recipes_limit.isdigit():
+            recipes = recipes.annotate(
+                row_number=Window(
+                    expression=RowNumber(),
+                    partition_by=F('author_id'),
+                    order_by=(F('pub_date').desc(), F('id').desc()),
+                )
+            ).filter(row_number__lte=int(recipes_limit))
         subscriptions = User.objects.filter(
-            author__user=request.user)
+            author__user=request.user
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
         page = self.paginate_queryset(subscriptions)
         serializer = SubscribeSerializer(
             page, many=True, context={'request': request})
         return self.get_paginated_response(serializer.data)
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogueViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read-only catalogue served from a versioned cache of its JSON."""
+    catalogue_name = None
+    pagination_class = None
+
+    def list(self, request, *args, **kwargs):
+        payload = get_catalogue(self.catalogue_name, self.render_catalogue)
+        use_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = payload.gzipped_etag if use_gzip else payload.etag
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        elif use_gzip:
+            response = HttpResponse(
+                payload.gzipped_body, content_type='application/json')
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(
+                payload.body, content_type='application/json')
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+    def render_catalogue(self):
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return JSONRenderer().render(serializer.data)
+
+
+class IngredientViewSet(CatalogueViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_class = IngredientFilter
-    pagination_class = None
+    catalogue_name = 'ingredients'
 
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        limit = request.query_params.get('limit')
+        limit = int(limit) if limit and limit.isdigit() else None
+        return Response(ingredient_index.search(name, limit))
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+
+class TagViewSet(CatalogueViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
-    pagination_class = None
+    catalogue_name = 'tags'
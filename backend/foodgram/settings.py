@@ -96,6 +96,67 @@ REST_FRAMEWORK = {
     'PAGINATE_BY_PARAM': 'limit',
 }
 
+# Cache shared by every process, so catalogue versions bumped by one
+# (a gunicorn worker or a management command) reach all of them
+REDIS_URL = os.getenv('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+            'OPTIONS': {'MAX_ENTRIES': 100000},
+        }
+    }
+
+# Render recipe lists and details through api.fast_read and orjson
+RECIPE_FAST_READ = os.getenv('RECIPE_FAST_READ', 'False') == 'True'
+
+# Cache viewer-independent recipe representations (implies fast read)
+RECIPE_CACHE = os.getenv('RECIPE_CACHE', 'False') == 'True'
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Lifetime of cached per-user favorite, shopping cart and following id sets
+USER_RELATIONS_CACHE_TIMEOUT = int(
+    os.getenv('USER_RELATIONS_CACHE_TIMEOUT', 60 * 60))
+
+# Recipe search backend: 'fts5' (SQLite only), 'python' or 'auto'. The
+# FTS5 table is built by rebuild_search_index; until then 'python' is used.
+RECIPE_SEARCH_BACKEND = os.getenv('RECIPE_SEARCH_BACKEND', 'auto')
+
+# Largest accepted decoded recipe image upload, in bytes
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024))
+
+# Largest accepted recipe image area, in pixels
+IMAGE_UPLOAD_MAX_PIXELS = int(
+    os.getenv('IMAGE_UPLOAD_MAX_PIXELS', 40 * 1000 * 1000))
+
+# Longer sides of uploaded recipe images are downscaled to this size
+IMAGE_MAX_DIMENSION = int(os.getenv('IMAGE_MAX_DIMENSION', 2560))
+
+# Processes rendering recipe image variants, 0 renders them in-process
+IMAGE_VARIANT_WORKERS = int(os.getenv('IMAGE_VARIANT_WORKERS', 2))
+
+# TTF font with Cyrillic glyphs for shopping cart PDF downloads
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
+SHOPPING_CART_PDF_CACHE_TIMEOUT = int(
+    os.getenv('SHOPPING_CART_PDF_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Larger PDFs are streamed from a temporary file without being cached
+SHOPPING_CART_PDF_CACHE_MAX_SIZE = 1024 * 1024
+
 DJOSER = {
     'SERIALIZERS': {
         'user': 'api.serializers.UserSerializer',
@@ -1,7 +1,9 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
+from django.db.models import Prefetch
 from django.utils.safestring import mark_safe
 
+from recipes.cart_totals import track_recipe_amounts
 from recipes.constants import ADMIN_INLINE_EXTRA
 from recipes.models import (
     AmountIngredient,
@@ -16,6 +18,7 @@ from recipes.models import (
 class IngredientInline(admin.TabularInline):
     model = AmountIngredient
     extra = ADMIN_INLINE_EXTRA
+    raw_id_fields = ('ingredient',)
 
 
 @admin.register(Recipe)
@@ -38,11 +41,22 @@ class RecipeAdmin(admin.ModelAdmin):
         'author__username',
         'tags__name',
     )
-    list_filter = ('name', 'author__username', 'tags__name')
+    list_filter = ('tags',)
     list_display_links = ('name', 'author')
+    list_select_related = ('author',)
+    date_hierarchy = 'pub_date'
+    show_full_result_count = False
     raw_id_fields = ('author',)
     inlines = (IngredientInline,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('ingredients', queryset=Ingredient.objects.only('name')))
+
+    def save_related(self, request, form, formsets, change):
+        with track_recipe_amounts([form.instance.id]):
+            super().save_related(request, form, formsets, change)
+
     @admin.display(description='Ingredients')
     def display_ingredients(self, obj):
         ingredients_list = [
@@ -56,16 +70,17 @@ class RecipeAdmin(admin.ModelAdmin):
         return mark_safe(
             f"<img src={obj.image.url} width='70' height='35' border='3'>")
 
-    @admin.display(description='In favorites')
+    @admin.display(description='In favorites', ordering='favorites_count')
     def display_favorites_count(self, obj):
-        return obj.recipes_favorite_related.count()
+        return obj.favorites_count
 
 
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
     search_fields = ('name',)
-    list_filter = ('name',)
+    list_filter = ('measurement_unit',)
+    show_full_result_count = False
 
 
 @admin.register(Tag)
@@ -80,6 +95,8 @@ class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
     list_display_links = ('user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    raw_id_fields = ('user', 'recipe')
 
 
 @admin.register(Favorite)
@@ -87,11 +104,34 @@ class FavoriteAdmin(admin.ModelAdmin):
     list_display = ('user', 'recipe', 'date_added')
     search_fields = ('user__username', 'recipe__name')
     list_display_links = ('user', 'recipe')
+    list_select_related = ('user', 'recipe__author')
+    raw_id_fields = ('user', 'recipe')
 
 
 @admin.register(AmountIngredient)
 class AmountIngredientAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe__author', 'ingredient')
+    raw_id_fields = ('recipe', 'ingredient')
+
+    def save_model(self, request, obj, form, change):
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe')} - {None}
+        with track_recipe_amounts(recipe_ids):
+            super().save_model(request, obj, form, change)
+        # Edits made outside a recipe save still bump Recipe.updated, which
+        # cached recipe bodies and process-local indexes follow.
+        Recipe.objects.filter(pk__in=recipe_ids).touch()
+
+    def delete_model(self, request, obj):
+        with track_recipe_amounts([obj.recipe_id]):
+            super().delete_model(request, obj)
+        Recipe.objects.filter(pk=obj.recipe_id).touch()
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = set(queryset.values_list('recipe_id', flat=True))
+        with track_recipe_amounts(recipe_ids):
+            super().delete_queryset(request, queryset)
+        Recipe.objects.filter(pk__in=recipe_ids).touch()
 
 
 admin.site.site_header = 'Foodgram Administration'
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RecipesConfig(AppConfig):
     name = 'recipes'
     verbose_name = 'Recipes Management'
+
+    def ready(self):
+        import recipes.signals  # noqa: F401
@@ -0,0 +1,144 @@
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.db.models import Sum
+
+from recipes.models import (
+    AmountIngredient,
+    ShoppingCart,
+    ShoppingCartIngredient,
+)
+
+# Attempts to apply cart total changes racing with concurrent inserts
+CART_TOTALS_ATTEMPTS = 3
+
+
+def get_recipe_amounts(recipe_ids):
+    """Return {recipe id: {ingredient id: amount}} for the given recipes."""
+    amounts = defaultdict(lambda: defaultdict(int))
+    for recipe_id, ingredient_id, amount in AmountIngredient.objects.filter(
+            recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id', 'amount'):
+        amounts[recipe_id][ingredient_id] += amount
+    return amounts
+
+
+def sum_recipe_amounts(recipe_ids):
+    """Return {ingredient id: amount} summed over the given recipes."""
+    return dict(
+        AmountIngredient.objects.filter(recipe_id__in=recipe_ids)
+        .values('ingredient_id')
+        .annotate(total=Sum('amount'))
+        .values_list('ingredient_id', 'total')
+        .order_by()
+    )
+
+
+def retry_racing_inserts(apply, *args):
+    """Run apply in a savepoint, again if a concurrent insert wins."""
+    for attempt in range(CART_TOTALS_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                apply(*args)
+            return
+        except IntegrityError:
+            # A concurrent transaction inserted one of the rows first;
+            # they are locked and updated on the next attempt.
+            if attempt == CART_TOTALS_ATTEMPTS - 1:
+                raise
+
+
+def change_cart_totals(user_ids, deltas):
+    """Add {ingredient id: delta} to the cart totals of the given users."""
+    deltas = {
+        ingredient_id: delta
+        for ingredient_id, delta in deltas.items() if delta}
+    if not user_ids or not deltas:
+        return
+    retry_racing_inserts(apply_cart_totals, user_ids, deltas)
+
+
+def recount_cart_totals(user_ids):
+    """Recompute the cart totals of the given users from their carts.
+
+    Cart rows a concurrent add inserted first are counted once, however
+    many requests tried to add them.
+    """
+    retry_racing_inserts(replace_cart_totals, user_ids)
+
+
+def apply_cart_totals(user_ids, deltas):
+    rows = {
+        (row.user_id, row.ingredient_id): row
+        for row in ShoppingCartIngredient.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=deltas)
+    }
+    to_create = []
+    to_update = []
+    to_delete = []
+    for user_id in user_ids:
+        for ingredient_id, delta in deltas.items():
+            row = rows.get((user_id, ingredient_id))
+            if row is None:
+                if delta > 0:
+                    to_create.append(ShoppingCartIngredient(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        amount=delta))
+            elif row.amount + delta > 0:
+                row.amount += delta
+                to_update.append(row)
+            else:
+                to_delete.append(row.id)
+    if to_delete:
+        ShoppingCartIngredient.objects.filter(id__in=to_delete).delete()
+    if to_update:
+        ShoppingCartIngredient.objects.bulk_update(to_update, ('amount',))
+    if to_create:
+        ShoppingCartIngredient.objects.bulk_create(to_create)
+
+
+@contextmanager
+def track_recipe_amounts(recipe_ids):
+    """Carry ingredient edits made in the block over to the cart totals."""
+    before = get_recipe_amounts(recipe_ids)
+    yield
+    after = get_recipe_amounts(recipe_ids)
+    for recipe_id in before.keys() | after.keys():
+        old, new = before[recipe_id], after[recipe_id]
+        deltas = {
+            ingredient_id: new[ingredient_id] - old[ingredient_id]
+            for ingredient_id in old.keys() | new.keys()}
+        if any(deltas.values()):
+            change_cart_totals(
+                list(ShoppingCart.objects.filter(
+                    recipe_id=recipe_id).values_list('user_id', flat=True)),
+                deltas)
+
+
+def replace_cart_totals(user_ids):
+    ShoppingCartIngredient.objects.filter(user_id__in=user_ids).delete()
+    ShoppingCartIngredient.objects.bulk_create(
+        ShoppingCartIngredient(
+            user_id=user_id, ingredient_id=ingredient_id, amount=amount)
+        for user_id, ingredient_id, amount in get_live_cart_totals(user_ids))
+
+
+def get_live_cart_totals(user_ids=None):
+    """Aggregate (user id, ingredient id, amount) rows from cart recipes.
+
+    Covers every cart, or only the carts of the given users.
+    """
+    if user_ids is None:
+        carts = {'recipe__recipes_shoppingcart_related__isnull': False}
+    else:
+        carts = {'recipe__recipes_shoppingcart_related__user__in': user_ids}
+    return (
+        AmountIngredient.objects
+        .filter(**carts)
+        .values_list(
+            'recipe__recipes_shoppingcart_related__user',
+            'ingredient_id')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
@@ -26,3 +26,24 @@ MAX_LEN_TITLE = 200
 
 # Maximum number of extra inline forms to use in Admin site
 ADMIN_INLINE_EXTRA = 1
+
+# Maximum number of recipes in one bulk favorite or shopping cart request
+MAX_BULK_RECIPES = 100
+
+# Maximum number of ingredients in one pantry search
+MAX_PANTRY_INGREDIENTS = 100
+
+# Recipe image variants as name -> bounding box (width, height) in pixels
+IMAGE_VARIANT_SIZES = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+}
+
+# Pillow formats image variants are saved in, as format -> file extension
+IMAGE_VARIANT_FORMATS = {
+    'JPEG': 'jpg',
+    'WEBP': 'webp',
+}
+
+# Encoder quality of image variants
+IMAGE_VARIANT_QUALITY = 80
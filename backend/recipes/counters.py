@@ -0,0 +1,40 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe
+from users.models import Subscription, User
+
+
+def count_subquery(queryset, field):
+    """Subquery counting rows of queryset related to the outer row."""
+    return Coalesce(Subquery(
+        queryset.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+# Denormalized counters as (model, field, related model, related field).
+COUNTERS = (
+    (Recipe, 'favorites_count', Favorite, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscription, 'author'),
+)
+
+
+def get_actual_count(related_model, related_field):
+    return count_subquery(related_model.objects.all(), related_field)
+
+
+def recount(model, field, related_model, related_field):
+    """Recompute a denormalized counter of every row."""
+    return model.objects.update(
+        **{field: get_actual_count(related_model, related_field)})
+
+
+def recount_favorites(recipes):
+    """Recompute favorites_count of the given recipes."""
+    return recipes.update(
+        favorites_count=get_actual_count(Favorite, 'recipe'))
@@ -1,9 +1,14 @@
+import csv
 import json
 import logging
+from itertools import islice
+from pathlib import Path
+from time import perf_counter
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
+from api.caches import bump_catalogue_version
 from recipes.models import Ingredient, Tag
 
 logging.basicConfig(
@@ -12,37 +17,134 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+DEFAULT_BATCH_SIZE = 1000
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK_SIZE):
+    """Yield objects of a top-level JSON array without loading it whole.
+
+    Items must be objects: a number at the end of a chunk would decode
+    as a shorter number, while an object needs its closing brace.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    eof = False
+    while True:
+        while position < len(buffer) and (
+                buffer[position].isspace() or buffer[position] == ','):
+            position += 1
+        if position == len(buffer):
+            if eof:
+                raise ValueError('unexpected end of JSON array')
+            buffer, position = file.read(chunk_size), 0
+            eof = not buffer
+            continue
+        if not started:
+            if buffer[position] != '[':
+                raise ValueError('top-level JSON value is not an array')
+            started = True
+            position += 1
+            continue
+        if buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if not isinstance(item, dict):
+            raise ValueError('JSON array item is not an object')
+        yield item
+        position = end
+
+
+def iter_csv_rows(file, fields):
+    """Yield rows of a headerless CSV file as dicts."""
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fields, row))
+
+
+def iter_records(path, fields):
+    with open(path, encoding='utf-8', newline='') as file:
+        if path.suffix == '.csv':
+            yield from iter_csv_rows(file, fields)
+        else:
+            yield from iter_json_array(file)
+
 
 class Command(BaseCommand):
     help = 'Upload data to Ingredients and Tags'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--ingredients',
+            type=Path,
+            default=settings.BASE_DIR / 'data' / 'ingredients.json',
+            help='Path to ingredients .json or headerless .csv file',
+        )
+        parser.add_argument(
+            '--tags',
+            type=Path,
+            default=settings.BASE_DIR / 'data' / 'tags.json',
+            help='Path to tags .json or headerless .csv file',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of rows inserted per query',
+        )
+
     def handle(self, *args, **kwargs):
         logger.info('Upload data to Ingredients and Tags is starting.')
+        batch_size = kwargs['batch_size']
+        if batch_size < 1:
+            raise CommandError('Batch size must be positive')
 
-        ingredients_file = open(
-            f'{settings.BASE_DIR}/data/ingredients.json',
-            encoding='utf-8')
-        try:
-            ingredients_data = json.load(ingredients_file)
-            for item in ingredients_data:
-                Ingredient.objects.get_or_create(**item)
-        except FileNotFoundError as ingredients_error:
-            logger.error(f'{ingredients_error}: Ingredients file not found')
-            raise CommandError('Ingredients file not found')
-        finally:
-            ingredients_file.close()
-
-        tags_file = open(
-            f'{settings.BASE_DIR}/data/tags.json',
-            encoding='utf-8')
-        try:
-            tags_data = json.load(tags_file)
-            for item in tags_data:
-                Tag.objects.get_or_create(**item)
-        except FileNotFoundError as tags_error:
-            logger.error(f'{tags_error}: Tags file not found')
-            raise CommandError('Tags file not found')
-        finally:
-            tags_file.close()
+        self.load(
+            Ingredient, kwargs['ingredients'],
+            ('name', 'measurement_unit'), batch_size)
+        bump_catalogue_version('ingredients')
+        self.load(
+            Tag, kwargs['tags'],
+            ('name', 'color', 'slug'), batch_size)
+        bump_catalogue_version('tags')
 
         logger.info('Upload data to Ingredients and Tags is complete.')
+
+    def load(self, model, path, fields, batch_size):
+        """Insert rows from file in batches, skipping existing ones."""
+        name = model._meta.verbose_name_plural
+        if not path.is_file():
+            logger.error(f'{path}: {name} file not found')
+            raise CommandError(f'{name} file not found')
+        started = perf_counter()
+        count_before = model.objects.count()
+        total = 0
+        records = iter_records(path, fields)
+        try:
+            while True:
+                batch = [
+                    model(**{field: record[field] for field in fields})
+                    for record in islice(records, batch_size)
+                ]
+                if not batch:
+                    break
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+                total += len(batch)
+        except (KeyError, TypeError, ValueError) as error:
+            logger.error(f'{path}: {error}')
+            raise CommandError(f'{name} file is malformed: {error}')
+        inserted = model.objects.count() - count_before
+        message = (
+            f'{name}: {total} rows read, {inserted} inserted, '
+            f'{total - inserted} skipped in {perf_counter() - started:.2f}s')
+        logger.info(message)
+        self.stdout.write(self.style.SUCCESS(message))
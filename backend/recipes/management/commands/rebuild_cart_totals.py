@@ -0,0 +1,59 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.cart_totals import get_live_cart_totals
+from recipes.models import ShoppingCartIngredient
+
+DEFAULT_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized shopping cart totals from cart recipes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report users whose cart totals have drifted',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='Number of rows inserted per query',
+        )
+
+    def handle(self, *args, **kwargs):
+        if kwargs['batch_size'] < 1:
+            raise CommandError('Batch size must be positive')
+        with transaction.atomic():
+            live = self.group_by_user(get_live_cart_totals())
+            stored = self.group_by_user(
+                ShoppingCartIngredient.objects.select_for_update()
+                .values_list('user_id', 'ingredient_id', 'amount'))
+            drifted = {
+                user_id for user_id in live.keys() | stored.keys()
+                if live.get(user_id) != stored.get(user_id)}
+            if kwargs['check']:
+                action = 'drifted'
+            else:
+                action = 'repaired'
+                ShoppingCartIngredient.objects.filter(
+                    user_id__in=drifted).delete()
+                ShoppingCartIngredient.objects.bulk_create(
+                    (ShoppingCartIngredient(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        amount=amount)
+                     for user_id in drifted
+                     for ingredient_id, amount in live.get(
+                         user_id, {}).items()),
+                    batch_size=kwargs['batch_size'])
+        self.stdout.write(
+            f'shopping cart totals: {len(drifted)} users {action}')
+
+    @staticmethod
+    def group_by_user(rows):
+        totals = {}
+        for user_id, ingredient_id, amount in rows.iterator():
+            totals.setdefault(user_id, {})[ingredient_id] = amount
+        return totals
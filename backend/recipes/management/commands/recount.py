@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from recipes.counters import COUNTERS, get_actual_count
+
+
+class Command(BaseCommand):
+    help = 'Recompute denormalized favorites, recipes and subscribers counts'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report rows whose counters have drifted',
+        )
+
+    def handle(self, *args, **kwargs):
+        for model, field, related_model, related_field in COUNTERS:
+            actual_count = get_actual_count(related_model, related_field)
+            drifted = model.objects.annotate(
+                actual_count=actual_count
+            ).exclude(**{field: F('actual_count')})
+            if kwargs['check']:
+                count, action = drifted.count(), 'drifted'
+            else:
+                count, action = model.objects.filter(
+                    pk__in=drifted.values('pk')
+                ).update(**{field: actual_count}), 'repaired'
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}.{field}: '
+                f'{count} {action}')
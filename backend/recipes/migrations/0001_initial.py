@@ -0,0 +1,109 @@
+# Generated by Django 4.2.5 on 2026-10-17 03:41
+
+import colorfield.fields
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AmountIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveSmallIntegerField(help_text='Enter amount of ingredient', validators=[django.core.validators.MinValueValidator(limit_value=1, message='At least 1!'), django.core.validators.MaxValueValidator(limit_value=32767, message='No more than 32767!')], verbose_name='Amount of ingredient')),
+            ],
+            options={
+                'verbose_name': 'Ingredient from recipe',
+                'verbose_name_plural': 'Ingredients from recipe',
+                'ordering': ('recipe',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Favorite',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date_added', models.DateTimeField(auto_now_add=True, verbose_name='Date of addition')),
+            ],
+            options={
+                'verbose_name': 'Favorite recipe',
+                'verbose_name_plural': 'Favorite recipes',
+            },
+        ),
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Enter ingredient name', max_length=200, verbose_name='Ingredient name')),
+                ('measurement_unit', models.CharField(help_text='Enter measurement unit', max_length=200, verbose_name='Measurement unit')),
+            ],
+            options={
+                'verbose_name': 'Ingredient',
+                'verbose_name_plural': 'Ingredients',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='Recipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Enter recipe name', max_length=200, verbose_name='Recipe name')),
+                ('text', models.TextField(help_text='Enter recipe text', verbose_name='Recipe text')),
+                ('image', models.ImageField(db_index=True, help_text='Upload recipe image', storage=recipes.storage.ContentAddressedStorage(), upload_to='recipes/images/', verbose_name='Recipe image')),
+                ('image_variants', models.JSONField(default=dict, editable=False, verbose_name='Image variants')),
+                ('pub_date', models.DateTimeField(auto_now_add=True, verbose_name='Publication date')),
+                ('updated', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Update date')),
+                ('cooking_time', models.PositiveSmallIntegerField(help_text='Enter cooking time in minutes', validators=[django.core.validators.MinValueValidator(limit_value=1, message='At least 1 minute!'), django.core.validators.MaxValueValidator(limit_value=32767, message='No more than 32767 minutes!')], verbose_name='Cooking time')),
+                ('favorites_count', models.PositiveIntegerField(default=0, editable=False, verbose_name='Favorites count')),
+            ],
+            options={
+                'verbose_name': 'Recipe',
+                'verbose_name_plural': 'Recipes',
+                'ordering': ('-pub_date',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ShoppingCart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ],
+            options={
+                'verbose_name': 'Recipe in shopping cart',
+                'verbose_name_plural': 'Recipes in shopping cart',
+            },
+        ),
+        migrations.CreateModel(
+            name='Tag',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Enter tag name', max_length=200, unique=True, verbose_name='Tag name')),
+                ('slug', models.SlugField(help_text='Enter tag slug', max_length=200, unique=True, verbose_name='Tag slug')),
+                ('color', colorfield.fields.ColorField(default='#FFFFFF', help_text='Choose color for tag', image_field=None, max_length=7, samples=None, unique=True, verbose_name='HEX-code for color')),
+            ],
+            options={
+                'verbose_name': 'Tag',
+                'verbose_name_plural': 'Tags',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='ShoppingCartIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Total amount of ingredient')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='recipes.ingredient', verbose_name='Ingredient')),
+            ],
+            options={
+                'verbose_name': 'Ingredient in shopping cart',
+                'verbose_name_plural': 'Ingredients in shopping cart',
+            },
+        ),
+    ]
@@ -2,8 +2,10 @@ from colorfield.fields import ColorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.db.models.functions import Length
+from django.utils import timezone
 
 from recipes.constants import MAX_AMOUNT, MAX_HEX, MAX_LEN_TITLE, MIN_AMOUNT
+from recipes.storage import image_storage
 from users.models import User
 
 models.CharField.register_lookup(Length)
@@ -67,6 +69,31 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
+class RecipeQuerySet(models.QuerySet):
+    """QuerySet for recipes."""
+
+    @staticmethod
+    def read_prefetches():
+        """Prefetch lookups for the relations the read serializers touch."""
+        return (
+            'tags',
+            models.Prefetch(
+                'recipe_ingredient',
+                queryset=AmountIngredient.objects.select_related(
+                    'ingredient'),
+            ),
+        )
+
+    def with_read_relations(self):
+        """Load everything the recipe read serializers touch."""
+        return self.select_related('author').prefetch_related(
+            *self.read_prefetches())
+
+    def touch(self):
+        """Bump ``updated`` of recipes whose related rows changed."""
+        return self.update(updated=timezone.now())
+
+
 class Recipe(models.Model):
     """Recipe model."""
     name = models.CharField(
@@ -81,13 +108,25 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Recipe image',
         upload_to='recipes/images/',
+        storage=image_storage,
+        db_index=True,
         help_text='Upload recipe image'
     )
+    image_variants = models.JSONField(
+        verbose_name='Image variants',
+        default=dict,
+        editable=False,
+    )
     pub_date = models.DateTimeField(
         verbose_name='Publication date',
         auto_now_add=True,
         editable=False,
     )
+    updated = models.DateTimeField(
+        verbose_name='Update date',
+        auto_now=True,
+        db_index=True,
+    )
     author = models.ForeignKey(
         to=User,
         on_delete=models.CASCADE,
@@ -119,11 +158,24 @@ class Recipe(models.Model):
         through='AmountIngredient',
         help_text='Choose ingredients and amount'
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Favorites count',
+        default=0,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Recipe'
         verbose_name_plural = 'Recipes'
         ordering = ('-pub_date',)
+        indexes = (
+            models.Index(
+                fields=('-pub_date', '-id'),
+                name='recipe_pub_date_id_idx',
+            ),
+        )
         constraints = (
             models.CheckConstraint(
                 check=models.Q(name__length__gt=0),
@@ -238,3 +290,35 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.recipe} is in {self.user} shopping cart'
+
+
+class ShoppingCartIngredient(models.Model):
+    """Total amount of an ingredient over all recipes in a user's cart."""
+    user = models.ForeignKey(
+        to=User,
+        verbose_name='User',
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+    )
+    ingredient = models.ForeignKey(
+        to=Ingredient,
+        verbose_name='Ingredient',
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Total amount of ingredient',
+    )
+
+    class Meta:
+        verbose_name = 'Ingredient in shopping cart'
+        verbose_name_plural = 'Ingredients in shopping cart'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_ingredient',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.user} needs {self.amount} of {self.ingredient}'
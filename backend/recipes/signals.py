@@ -0,0 +1,121 @@
+from django.db.migrations import AddField
+from django.db.models import F, PositiveIntegerField
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    post_delete,
+    post_migrate,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import Signal, receiver
+
+from recipes.cart_totals import (
+    change_cart_totals,
+    recount_cart_totals,
+    sum_recipe_amounts,
+)
+from recipes.counters import COUNTERS, recount, recount_favorites
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription, User
+
+# Sent after relations are inserted with bulk_create, which does not
+# send post_save. Provides ``user`` and ``target_ids`` arguments.
+relations_bulk_created = Signal()
+# Sent after relations are deleted in bulk without per-row delete
+# signals. Provides ``user`` and ``target_ids`` arguments.
+relations_bulk_deleted = Signal()
+
+
+def change_counter(queryset, field, delta):
+    # Clamped at zero, as a counter that drifted low must not fail the
+    # delete that decrements it.
+    queryset.update(**{field: Greatest(
+        F(field) + delta, 0, output_field=PositiveIntegerField())})
+
+
+@receiver(post_migrate)
+def backfill_counters(sender, plan=None, **kwargs):
+    """Recount counter columns added to existing tables by a migration."""
+    if sender.name != 'recipes' or not plan:
+        return
+    added_fields = {
+        (migration.app_label, operation.model_name_lower,
+         operation.name_lower)
+        for migration, backwards in plan if not backwards
+        for operation in migration.operations
+        if isinstance(operation, AddField)}
+    for model, field, related_model, related_field in COUNTERS:
+        opts = model._meta
+        if (opts.app_label, opts.model_name, field) in added_fields:
+            recount(model, field, related_model, related_field)
+
+
+@receiver(post_save, sender=Favorite)
+def increment_favorites_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            Recipe.objects.filter(pk=instance.recipe_id),
+            'favorites_count', 1)
+
+
+@receiver(post_delete, sender=Favorite)
+def decrement_favorites_count(sender, instance, **kwargs):
+    change_counter(
+        Recipe.objects.filter(pk=instance.recipe_id), 'favorites_count', -1)
+
+
+@receiver((relations_bulk_created, relations_bulk_deleted), sender=Favorite)
+def recount_bulk_favorites(sender, target_ids, **kwargs):
+    recount_favorites(Recipe.objects.filter(pk__in=target_ids))
+
+
+@receiver(post_save, sender=Recipe)
+def increment_recipes_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id), 'recipes_count', 1)
+
+
+@receiver(post_delete, sender=Recipe)
+def decrement_recipes_count(sender, instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'recipes_count', -1)
+
+
+@receiver(post_save, sender=Subscription)
+def increment_subscribers_count(sender, instance, created, **kwargs):
+    if created:
+        change_counter(
+            User.objects.filter(pk=instance.author_id),
+            'subscribers_count', 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def decrement_subscribers_count(sender, instance, **kwargs):
+    change_counter(
+        User.objects.filter(pk=instance.author_id), 'subscribers_count', -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_cart_totals(sender, instance, created, **kwargs):
+    if created:
+        change_cart_totals(
+            [instance.user_id], sum_recipe_amounts([instance.recipe_id]))
+
+
+@receiver(pre_delete, sender=ShoppingCart)
+def subtract_cart_totals(sender, instance, **kwargs):
+    # pre_delete: when a recipe is deleted its ingredient amounts may be
+    # removed before the cart rows are.
+    amounts = sum_recipe_amounts([instance.recipe_id])
+    change_cart_totals(
+        [instance.user_id],
+        {ingredient_id: -amount for ingredient_id, amount in amounts.items()})
+
+
+@receiver(
+    (relations_bulk_created, relations_bulk_deleted), sender=ShoppingCart)
+def recount_bulk_cart_totals(sender, user, **kwargs):
+    # Rows a concurrent add inserted first were skipped by the bulk
+    # insert, so adding the amounts of target_ids could count them twice.
+    recount_cart_totals([user.id])
@@ -0,0 +1,70 @@
+import hashlib
+import os
+from datetime import datetime, timezone
+from pathlib import PurePosixPath
+from uuid import uuid4
+
+from django.core.files.storage import FileSystemStorage
+
+HASH_CHUNK_SIZE = 64 * 1024
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """File storage naming files after the SHA-256 of their content.
+
+    ``upload_to/ab/abcdef….ext`` is written once however many times the
+    same bytes are saved; saving existing content only returns its name.
+    """
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def get_content_name(self, name, content):
+        """Return the name content is stored under when saved as name."""
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+        content.seek(0)
+        path = PurePosixPath(name)
+        digest = digest.hexdigest()
+        return str(
+            path.parent / digest[:2] / f'{digest}{path.suffix.lower()}')
+
+    def _save(self, name, content):
+        name = self.get_content_name(name, content)
+        try:
+            # Refresh the age orphan cleanup checks for reused content.
+            os.utime(self.path(name))
+            return name
+        except FileNotFoundError:
+            pass
+        # Concurrent saves of the same bytes each write a temporary file
+        # and the last rename wins with identical content.
+        temporary_name = super()._save(f'{name}.{uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary_name), self.path(name))
+        return name
+
+    def delete_if_older(self, name, cutoff):
+        """Delete a file unless it was saved or reused after cutoff.
+
+        The file is moved aside before its age is checked, so a
+        concurrent save of the same content either refreshed it first
+        and keeps it, or writes a fresh copy.
+        """
+        path = self.path(name)
+        moved_path = f'{path}.{uuid4().hex}.deleted'
+        try:
+            os.replace(path, moved_path)
+        except FileNotFoundError:
+            return False
+        modified = datetime.fromtimestamp(
+            os.stat(moved_path).st_mtime, tz=timezone.utc)
+        if modified >= cutoff:
+            os.replace(moved_path, path)
+            return False
+        os.remove(moved_path)
+        return True
+
+
+image_storage = ContentAddressedStorage()
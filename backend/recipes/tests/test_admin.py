@@ -0,0 +1,57 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.tests.base import FoodgramTestCase
+from recipes.models import Favorite, ShoppingCart
+
+
+class AdminChangelistMixin:
+    """Checks that admin changelists run a fixed number of queries.
+
+    ``changelists`` maps changelist URLs to their query counts. Concrete
+    classes define ``add_row(index)``, which adds one row to each of them.
+    """
+    changelists = {}
+
+    def setUp(self):
+        super().setUp()
+        admin_user = self.create_user('admin')
+        admin_user.is_staff = admin_user.is_superuser = True
+        admin_user.save()
+        self.client.force_login(admin_user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        for rows in (1, 10):
+            for index in range(rows):
+                self.add_row(f'{rows}_{index}')
+            for url, expected in self.changelists.items():
+                with self.subTest(url=url, rows=rows):
+                    self.assertEqual(self.count_queries(url), expected)
+
+
+class RecipesAdminTests(AdminChangelistMixin, FoodgramTestCase):
+    changelists = {
+        '/admin/recipes/recipe/': 8,
+        '/admin/recipes/ingredient/': 5,
+        '/admin/recipes/tag/': 5,
+        '/admin/recipes/amountingredient/': 5,
+        '/admin/recipes/favorite/': 5,
+        '/admin/recipes/shoppingcart/': 5,
+    }
+
+    def add_row(self, index):
+        reader = self.create_user(f'reader{index}')
+        recipe = self.create_recipe(
+            self.create_user(f'author{index}'), name=f'Recipe {index}',
+            amounts={
+                self.create_ingredient(f'Salt {index}'): 1,
+                self.create_ingredient(f'Sugar {index}'): 2},
+            tags=[self.create_tag(f'tag{index}')])
+        Favorite.objects.create(user=reader, recipe=recipe)
+        ShoppingCart.objects.create(user=reader, recipe=recipe)
@@ -0,0 +1,60 @@
+import json
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.management.commands.loaddata import iter_json_array
+from recipes.models import Ingredient, Tag
+
+
+class IterJsonArrayTests(TestCase):
+
+    def test_objects_across_chunk_boundaries(self):
+        items = [{'name': f'Ингредиент {number}', 'measurement_unit': 'г'}
+                 for number in range(20)]
+        for chunk_size in (1, 3, 7, 64):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(list(iter_json_array(
+                    StringIO(json.dumps(items)), chunk_size)), items)
+
+    def test_scalar_items_are_rejected(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(StringIO('[12345, 678]'), chunk_size=3))
+
+    def test_truncated_array_is_rejected(self):
+        with self.assertRaises(ValueError):
+            list(iter_json_array(StringIO('[{"name": "Соль"}'), 4))
+
+
+class LoaddataCommandTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write(self, name, content):
+        path = self.directory / name
+        path.write_text(content, encoding='utf-8')
+        return path
+
+    def test_loads_json_and_csv(self):
+        ingredients = self.write('ingredients.json', json.dumps(
+            [{'name': 'Соль', 'measurement_unit': 'г'}]))
+        tags = self.write('tags.csv', 'Обед,#00ff00,lunch\n')
+        call_command(
+            'loaddata', ingredients=ingredients, tags=tags,
+            stdout=StringIO())
+        self.assertTrue(Ingredient.objects.filter(name='Соль').exists())
+        self.assertTrue(Tag.objects.filter(slug='lunch').exists())
+
+    def test_non_object_items_raise_command_error(self):
+        ingredients = self.write('ingredients.json', '[12345, 678]')
+        tags = self.write('tags.csv', '')
+        with self.assertRaises(CommandError):
+            call_command(
+                'loaddata', ingredients=ingredients, tags=tags,
+                stdout=StringIO())
@@ -16,20 +16,24 @@ class UserAdmin(UserAdmin):
         'is_active',
         'id'
     )
-    list_filter = ('email', 'first_name', 'is_active')
+    list_filter = ('is_active', 'is_staff')
     search_fields = ('username', 'email')
+    show_full_result_count = False
 
-    @admin.display(description='Count of recipes')
+    @admin.display(description='Count of recipes', ordering='recipes_count')
     def display_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
-    @admin.display(description='Count of subscribers')
+    @admin.display(
+        description='Count of subscribers', ordering='subscribers_count')
     def display_subscribers_count(self, obj):
-        return obj.author.count()
+        return obj.subscribers_count
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('user', 'author', 'id')
-    list_filter = ('user', 'author', 'id')
-    search_fields = ('user', 'author', 'id')
+    search_fields = ('user__username', 'author__username')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    show_full_result_count = False
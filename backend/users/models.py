@@ -44,6 +44,16 @@ class User(AbstractUser):
         max_length=MAX_LEN_NAME,
         help_text='Enter user last name'
     )
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Recipes count',
+        default=0,
+        editable=False,
+    )
+    subscribers_count = models.PositiveIntegerField(
+        verbose_name='Subscribers count',
+        default=0,
+        editable=False,
+    )
 
     class Meta:
         verbose_name = 'User'
@@ -0,0 +1,16 @@
+from api.tests.base import FoodgramTestCase
+from recipes.tests.test_admin import AdminChangelistMixin
+from users.models import Subscription
+
+
+class UsersAdminTests(AdminChangelistMixin, FoodgramTestCase):
+    changelists = {
+        '/admin/users/user/': 4,
+        '/admin/users/subscription/': 4,
+    }
+
+    def add_row(self, index):
+        author = self.create_user(f'author{index}')
+        self.create_recipe(author)
+        Subscription.objects.create(
+            user=self.create_user(f'reader{index}'), author=author)